@@ -0,0 +1,445 @@
+"""
+Golden-output equivalence and performance-budget check for Cluster and Persona Agent.
+
+Runs the clustering and persona pipeline on df_work3.csv with every available engine
+and verifies that:
+  - the personas agree with the committed personas_4_clusters.json / personas_5_clusters.json
+    (every golden field except those listed in EXCLUDED_GOLDEN_FIELDS)
+  - every engine produces the same cluster labels as the reference pandas engine, up to
+    a permutation of the cluster ids, and the same conversion drivers
+  - each stage stays within its time and memory budget; memory is the larger of the peak
+    Python allocations (tracemalloc) and the peak growth of the process RSS, which also
+    covers native allocations such as DuckDB's buffer manager (RSS needs psutil or Linux)
+
+Run it before swapping an optimized path into the app:
+
+    python check_golden_outputs.py
+    python check_golden_outputs.py --engines pandas --budget-scale 2
+    python check_golden_outputs.py --engines pandas progressive
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+from scipy.optimize import linear_sum_assignment
+
+from streamlit import config as st_config
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# The app is imported outside `streamlit run`; skip the direct-execution warning
+st_config.set_option('global.showWarningOnDirectExecution', False)
+
+import cluster_persona_agent as app
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA_FILE = os.path.join(HERE, 'df_work3.csv')
+GOLDEN_FILES = {
+    4: os.path.join(HERE, 'personas_4_clusters.json'),
+    5: os.path.join(HERE, 'personas_5_clusters.json'),
+}
+
+# Absolute tolerances: percentage points for rates and shares, total variation
+# distance for distributions
+RATE_TOLERANCE = 0.01
+CONCENTRATION_TOLERANCE = 0.01
+DISTRIBUTION_TOLERANCE = 0.01
+LIFT_TOLERANCE = 1e-9
+
+# Golden fields that are not compared, and why
+EXCLUDED_GOLDEN_FIELDS = {
+    'seniority': "the notebook matches keywords in the five most common titles and uses its own "
+                 "levels (e.g. 'C-Suite/Executive'); the app scores keywords over all titles",
+    'name': "built from the notebook's seniority level",
+}
+
+# Per-stage budgets: (seconds, peak memory in MB), for df_work3.csv. The first DuckDB
+# connection of the process allocates about 40 MB of native memory during 'load'.
+STAGE_BUDGETS = {
+    'load': (2.0, 100),
+    'clustering': (10.0, 100),
+    'personas': (5.0, 50),
+}
+
+
+# ========== ENGINES ==========
+
+def run_pandas_engine(n_clusters, stages):
+    """Reference engine: the pandas pipeline used by the app."""
+    with stages.measure('load'):
+        df = pd.read_csv(DATA_FILE, encoding='utf-8')
+        if 'Unnamed: 0' in df.columns:
+            df = df.drop(columns='Unnamed: 0')
+
+    with stages.measure('clustering'):
+        df_clustered, _, _ = app.perform_clustering(df, n_clusters=n_clusters)
+
+    with stages.measure('personas'):
+        personas = app.generate_personas(df_clustered, n_clusters)
+
+    return df_clustered['Cluster'].to_numpy(), personas
+
+
+def run_duckdb_engine(n_clusters, stages):
+    """DuckDB profiling backend."""
+    workdir = tempfile.mkdtemp(prefix='persona_golden_')
+    con = None
+    try:
+        with stages.measure('load'):
+            con = app.open_duckdb_source(DATA_FILE, workdir)
+            app.prepare_duckdb_leads(con)
+
+        with stages.measure('clustering'):
+            _, _, labels = app.perform_clustering_duckdb(con, n_clusters)
+
+        with stages.measure('personas'):
+            personas = app.create_personas_duckdb(con, n_clusters)
+
+        return labels, personas
+    finally:
+        if con is not None:
+            con.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run_progressive_engine(n_clusters, stages, sample_size=500):
+    """Progressive mode: K-Means on a stratified sample, refined on the full data.
+
+    Opt-in only: the warm-started refinement can converge to a different local optimum
+    than a full K-Means run, so it is not expected to match the golden files exactly.
+    """
+    with stages.measure('load'):
+        df = pd.read_csv(DATA_FILE, encoding='utf-8')
+        if 'Unnamed: 0' in df.columns:
+            df = df.drop(columns='Unnamed: 0')
+
+    with stages.measure('clustering'):
+        sample_idx = app.stratified_sample_indices(df, sample_size)
+        _, X_sample = app.prepare_features(df.iloc[sample_idx].copy())
+        sample_kmeans = app.cluster_sample(X_sample, n_clusters)
+        df_clustered, X_scaled = app.prepare_features(df)
+        initial_centers = app.sample_centers_in_full_space(X_scaled, sample_idx, sample_kmeans.labels_, n_clusters)
+        kmeans = app.refine_clustering(X_scaled, initial_centers)
+        df_clustered['Cluster'] = kmeans.labels_
+
+    with stages.measure('personas'):
+        personas = app.generate_personas(df_clustered, n_clusters)
+
+    return kmeans.labels_, personas
+
+
+ENGINES = {
+    'pandas': run_pandas_engine,
+    'duckdb': run_duckdb_engine,
+    'progressive': run_progressive_engine,
+}
+REFERENCE_ENGINE = 'pandas'
+
+
+def available_engines():
+    engines = ['pandas']
+    if app.DUCKDB_AVAILABLE:
+        engines.append('duckdb')
+    return engines
+
+
+# ========== MEASUREMENT ==========
+
+RSS_SAMPLE_INTERVAL = 0.005
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None when it cannot be read."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StageRecorder:
+    """Record wall time and peak memory of each pipeline stage.
+
+    The peak memory is the larger of the peak traced Python allocations and the peak RSS
+    growth over the stage, sampled on a background thread, so native memory (DuckDB, BLAS
+    work buffers) is counted too.
+    """
+
+    def __init__(self):
+        self.results = {}
+
+    @contextmanager
+    def measure(self, stage):
+        baseline = current_rss()
+        peak_rss = [baseline or 0]
+        done = threading.Event()
+
+        def sample():
+            while not done.wait(RSS_SAMPLE_INTERVAL):
+                peak_rss[0] = max(peak_rss[0], current_rss())
+
+        sampler = threading.Thread(target=sample, daemon=True) if baseline is not None else None
+        if sampler is not None:
+            sampler.start()
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            if sampler is not None:
+                done.set()
+                sampler.join()
+                peak = max(peak, max(peak_rss[0], current_rss()) - baseline)
+            self.results[stage] = (seconds, peak / (1024 * 1024))
+
+
+# ========== COMPARISONS ==========
+
+def golden_view(persona):
+    """Project an app persona onto the fields stored in the golden JSON files."""
+    size = persona['cluster_size']
+    return {
+        'size': size,
+        'total_conversions': persona['conversion_metrics']['conversions'],
+        'conversion_rate': persona['conversion_metrics']['conversion_rate'],
+        'primary_geography': str(persona['geography']['primary_state']),
+        'geo_concentration': sum(persona['geography']['top_states'].values()) / size * 100,
+        'primary_industry': str(persona['professional']['primary_industry']),
+        'industry_concentration': sum(persona['professional']['top_industries'].values()) / size * 100,
+        'experience_level': str(persona['demographics']['primary_experience']),
+        'primary_lead_source': str(persona['acquisition']['primary_lead_source']),
+        'gender_distribution': persona['demographics']['gender_distribution'],
+        # Most common values with their counts, for the tie-tolerant ranked comparisons
+        'state_counts': persona['geography']['top_states'],
+        'industry_counts': persona['professional']['top_industries'],
+        'title_counts': persona['professional']['top_job_titles'],
+    }
+
+
+def total_variation(dist_a, dist_b):
+    """Total variation distance between two count distributions."""
+    total_a, total_b = sum(dist_a.values()) or 1, sum(dist_b.values()) or 1
+    keys = set(dist_a) | set(dist_b)
+    return 0.5 * sum(abs(dist_a.get(k, 0) / total_a - dist_b.get(k, 0) / total_b) for k in keys)
+
+
+def ranked_values_match(golden_values, counts, offset=0, expected=None, cap=None):
+    """True when the golden values are the most common values from position `offset` on, up to
+    the order of values with tied counts.
+
+    `cap` is the top-N size `counts` was truncated to. A golden value missing from a full list
+    is only accepted in place of a value tied with the last count, since it may have been cut off.
+    """
+    ranked = [(str(value), count) for value, count in counts.items()]
+    expected = len(golden_values) if expected is None else min(expected, max(len(ranked) - offset, 0))
+    if len(golden_values) != expected:
+        return False
+
+    ranked_counts = dict(ranked)
+    for position, golden_value in enumerate(golden_values, start=offset):
+        value, count = ranked[position]
+        if golden_value == value or ranked_counts.get(golden_value) == count:
+            continue
+        cut_off = (golden_value not in ranked_counts and cap is not None and len(ranked) == cap
+                   and count == ranked[-1][1])
+        if not cut_off:
+            return False
+    return True
+
+
+def check_ranked_values_match():
+    """Sanity-check ranked_values_match on hand-made cases before trusting it on real data."""
+    counts = {'X': 10, 'A': 5, 'C': 3}
+    assert ranked_values_match(['A', 'C'], counts, 1, 2, cap=3)
+    assert ranked_values_match(['C', 'A'], {'X': 10, 'A': 5, 'C': 5}, 1, 2, cap=3)
+    assert ranked_values_match(['A', 'CUT'], counts, 1, 2, cap=3)
+    assert not ranked_values_match(['A', 'BOGUS'], counts, 1, 2)
+    assert not ranked_values_match(['A', 'BOGUS'], counts, 1, 2, cap=5)
+    assert not ranked_values_match(['BOGUS', 'C'], counts, 1, 2, cap=3)
+    assert not ranked_values_match(['C', 'A'], counts, 1, 2, cap=3)
+    assert not ranked_values_match(['NOPE'], {'A': 10}, 0, 1)
+    assert not ranked_values_match(['NOPE'], {'A': 10}, 0, 1, cap=3)
+    assert ranked_values_match(['A'], {'A': 10}, 0, 1, cap=3)
+
+
+def match_clusters(candidates, golden):
+    """Pair candidate and golden personas (cluster ids may be permuted) by size and conversions."""
+    cost = np.array([
+        [abs(c['size'] - g['size']) + abs(c['total_conversions'] - g['total_conversions']) for g in golden]
+        for c in candidates
+    ])
+    rows, cols = linear_sum_assignment(cost)
+    return list(zip(rows, cols))
+
+
+def compare_to_golden(personas, golden):
+    """Return a list of mismatches between the personas and the golden personas."""
+    if len(personas) != len(golden):
+        return [f"expected {len(golden)} personas, got {len(personas)}"]
+
+    candidates = [golden_view(p) for p in personas]
+    problems = []
+    for c_idx, g_idx in match_clusters(candidates, golden):
+        c, g = candidates[c_idx], golden[g_idx]
+        where = f"cluster {c_idx} vs golden cluster {g['cluster_id']}"
+
+        for key in ('size', 'total_conversions', 'primary_geography', 'primary_industry',
+                    'experience_level', 'primary_lead_source'):
+            if c[key] != g[key]:
+                problems.append(f"{where}: {key} {c[key]!r} != {g[key]!r}")
+
+        if abs(c['conversion_rate'] - g['conversion_rate']) > RATE_TOLERANCE:
+            problems.append(f"{where}: conversion_rate {c['conversion_rate']:.4f} != {g['conversion_rate']:.4f}")
+
+        for key in ('geo_concentration', 'industry_concentration'):
+            if abs(c[key] - g[key]) > CONCENTRATION_TOLERANCE:
+                problems.append(f"{where}: {key} {c[key]:.4f} != {g[key]:.4f}")
+
+        tvd = total_variation(c['gender_distribution'], g['gender_distribution'])
+        if tvd > DISTRIBUTION_TOLERANCE:
+            problems.append(f"{where}: gender_distribution differs (TVD {tvd:.4f})")
+
+        # Secondary values are positions 2-3 of the top three, common titles the top three
+        for key, counts_key, column, offset, expected in (
+                ('secondary_geographies', 'state_counts', 'State', 1, 2),
+                ('secondary_industries', 'industry_counts', 'Industry', 1, 2),
+                ('common_titles', 'title_counts', 'Job Title', 0, 3)):
+            if not ranked_values_match(g[key], c[counts_key], offset, expected, app.PROFILE_TOP_N[column]):
+                problems.append(f"{where}: {key} {g[key]!r} not among the most common values "
+                                f"{list(c[counts_key])!r}")
+
+    return problems
+
+
+def labels_match_up_to_permutation(labels_a, labels_b):
+    """True when both labelings define the same partition of the records."""
+    labels_a, labels_b = np.asarray(labels_a), np.asarray(labels_b)
+    if labels_a.shape != labels_b.shape:
+        return False
+    pairs = np.unique(np.column_stack([labels_a, labels_b]), axis=0)
+    return len(pairs) == len(np.unique(labels_a)) == len(np.unique(labels_b))
+
+
+def compare_drivers(personas, labels, reference_personas, reference_labels):
+    """Return a list of clusters whose conversion drivers differ from the reference engine's.
+
+    Clusters are paired through the labels, which must match up to a permutation.
+    """
+    labels, reference_labels = np.asarray(labels), np.asarray(reference_labels)
+    reference = {p['cluster_id']: p['conversion_drivers'] for p in reference_personas}
+
+    problems = []
+    for persona in personas:
+        members = labels == persona['cluster_id']
+        if not members.any():
+            continue
+        reference_id = int(reference_labels[members][0])
+        drivers, expected = persona['conversion_drivers'], reference[reference_id]
+
+        same = len(drivers) == len(expected) and all(
+            (d['attribute'], d['value'], d['support'], d['conversions'])
+            == (e['attribute'], e['value'], e['support'], e['conversions'])
+            and abs(d['lift'] - e['lift']) <= LIFT_TOLERANCE
+            for d, e in zip(drivers, expected)
+        )
+        if not same:
+            problems.append(f"cluster {persona['cluster_id']} vs {REFERENCE_ENGINE} cluster {reference_id}: "
+                            f"conversion drivers differ")
+    return problems
+
+
+def check_budgets(stage_results, budget_scale):
+    """Return a list of stages that exceeded their time or memory budget."""
+    problems = []
+    for stage, (seconds, peak_mb) in stage_results.items():
+        max_seconds, max_mb = STAGE_BUDGETS[stage]
+        if seconds > max_seconds * budget_scale:
+            problems.append(f"{stage}: {seconds:.2f}s exceeds budget of {max_seconds * budget_scale:.2f}s")
+        if peak_mb > max_mb * budget_scale:
+            problems.append(f"{stage}: {peak_mb:.1f} MB exceeds budget of {max_mb * budget_scale:.1f} MB")
+    return problems
+
+
+# ========== REPORT ==========
+
+def run_checks(engines, budget_scale):
+    print("🔍 Checking golden outputs and performance budgets...\n")
+    print("Golden fields not compared:")
+    for field, reason in EXCLUDED_GOLDEN_FIELDS.items():
+        print(f"   - {field}: {reason}")
+    print("\n" + "=" * 60)
+
+    check_ranked_values_match()
+
+    # Load the heavy modules up front so the budgets measure the pipeline, not imports
+    app.prewarm_worker({})
+
+    failures = 0
+    for n_clusters, golden_file in GOLDEN_FILES.items():
+        with open(golden_file, encoding='utf-8') as f:
+            golden = json.load(f)
+
+        print(f"\n{n_clusters} clusters ({os.path.basename(golden_file)}):")
+        reference_labels = reference_personas = None
+        for engine in engines:
+            stages = StageRecorder()
+            labels, personas = ENGINES[engine](n_clusters, stages)
+
+            problems = compare_to_golden(personas, golden)
+            if engine == REFERENCE_ENGINE:
+                reference_labels, reference_personas = labels, personas
+            elif reference_labels is not None:
+                if labels_match_up_to_permutation(labels, reference_labels):
+                    problems += compare_drivers(personas, labels, reference_personas, reference_labels)
+                else:
+                    problems.append(f"labels differ from the {REFERENCE_ENGINE} engine beyond a permutation")
+            problems += check_budgets(stages.results, budget_scale)
+
+            timings = ', '.join(f"{stage} {seconds:.2f}s/{peak_mb:.1f}MB"
+                                for stage, (seconds, peak_mb) in stages.results.items())
+            if problems:
+                failures += 1
+                print(f"   ✗ {engine}: {timings}")
+                for problem in problems:
+                    print(f"      - {problem}")
+            else:
+                print(f"   ✓ {engine}: {timings}")
+
+    print("\n" + "=" * 60)
+    if failures:
+        print(f"\n❌ {failures} engine run(s) failed the golden-output or budget checks\n")
+    else:
+        print("\n✅ All engines match the golden outputs within budget\n")
+    print("=" * 60)
+    return failures == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--engines', nargs='+', choices=list(ENGINES), default=available_engines(),
+                        help="engines to check (default: all available exact engines)")
+    parser.add_argument('--budget-scale', type=float, default=1.0,
+                        help="multiply every time and memory budget, e.g. on slower machines")
+    args = parser.parse_args()
+
+    if REFERENCE_ENGINE in args.engines:
+        args.engines = [REFERENCE_ENGINE] + [e for e in args.engines if e != REFERENCE_ENGINE]
+    sys.exit(0 if run_checks(args.engines, args.budget_scale) else 1)
@@ -1,3 +1,5 @@
+import time
+_SCRIPT_START = time.perf_counter()
 import sys, site
 import streamlit as st
 ### This is to test where these libraries are ###
@@ -7,21 +9,30 @@ import streamlit as st
 #st.write("USER_SITE:", site.getusersitepackages())
 #st.write("sys.path has USER_SITE:",
 #         any(site.getusersitepackages() in p for p in sys.path))
-import sklearn
 #import streamlit as st
 import pandas as pd
 import numpy as np
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import LabelEncoder, StandardScaler
-from sklearn.decomposition import PCA
-import matplotlib.pyplot as plt
-import seaborn as sns
 import json
-from collections import Counter
 import warnings
 import io
-import base64
-from PIL import Image
+import csv
+import os
+import atexit
+import hashlib
+import importlib
+import importlib.util
+import sqlite3
+import shutil
+import tempfile
+import threading
+from contextlib import closing
+from datetime import datetime, timezone
+
+# Heavy libraries (scikit-learn, matplotlib, altair, duckdb) are imported lazily by
+# the stage that needs them, see lazy_import() below.
+
+# Optional: embedded columnar engine for profiling files larger than memory
+DUCKDB_AVAILABLE = importlib.util.find_spec('duckdb') is not None
 
 warnings.filterwarnings('ignore')
 
@@ -133,8 +144,108 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
+# ========== LAZY IMPORTS AND PRE-WARMING ==========
+
+# Set PERSONA_PREWARM=0 to disable the background pre-warm worker
+PREWARM_ENABLED = os.environ.get('PERSONA_PREWARM', '1') != '0'
+
+# Heavy modules imported in the background once the first page has been painted
+PREWARM_MODULES = [
+    'sklearn.preprocessing',
+    'sklearn.cluster',
+    'sklearn.decomposition',
+    'altair',
+    'matplotlib.pyplot',
+]
+
+
+@st.cache_resource(show_spinner=False)
+def import_timings():
+    """Process-wide record of heavy import times (seconds), shared by all sessions."""
+    return {}
+
+
+@st.cache_resource(show_spinner=False)
+def import_lock():
+    """Process-wide lock serializing heavy imports between the script and pre-warm threads."""
+    # Importing the same package (e.g. sklearn) from two threads at once can hand one of
+    # them a partially initialized module
+    return threading.RLock()
+
+
+def lazy_import(module_name, timings=None, lock=None):
+    """Import a heavy module on first use and record how long the import took."""
+    lock = import_lock() if lock is None else lock
+    with lock:
+        already_loaded = module_name in sys.modules
+        start = time.perf_counter()
+        module = importlib.import_module(module_name)
+    if not already_loaded:
+        timings = import_timings() if timings is None else timings
+        timings.setdefault(module_name, time.perf_counter() - start)
+    return module
+
+
+def prewarm_worker(timings, lock=None):
+    """Import the heavy analysis modules and warm up K-Means so the first upload is fast."""
+    for module_name in PREWARM_MODULES:
+        lazy_import(module_name, timings, lock)
+
+    # A tiny fit initialises the native thread pools used by K-Means
+    start = time.perf_counter()
+    KMeans = lazy_import('sklearn.cluster', timings, lock).KMeans
+    KMeans(n_clusters=2, random_state=RANDOM_STATE, n_init=1).fit(np.random.RandomState(0).rand(64, 8))
+    timings.setdefault('K-Means warm-up fit', time.perf_counter() - start)
+
+
+@st.cache_resource(show_spinner=False)
+def start_prewarm_worker():
+    """Start the pre-warm worker in a background thread, once per server process."""
+    # The timings store and lock are resolved here: cached resources need the script thread
+    worker = threading.Thread(target=prewarm_worker, args=(import_timings(), import_lock()),
+                              name='persona-prewarm', daemon=True)
+    worker.start()
+    return worker
+
+
+def render_startup_timings(first_paint_seconds):
+    """Show the time to first paint and the heavy import breakdown in the sidebar."""
+    with st.sidebar.expander("⏱️ Startup timings"):
+        st.markdown(f"**First paint:** {first_paint_seconds * 1000:,.0f} ms")
+        timings = dict(import_timings())
+        if timings:
+            st.dataframe(
+                pd.DataFrame({
+                    'Stage': list(timings.keys()),
+                    'Time (ms)': [round(seconds * 1000, 1) for seconds in timings.values()],
+                }),
+                hide_index=True,
+                use_container_width=True
+            )
+        else:
+            st.markdown("Heavy modules are still loading in the background.")
+
+
 # ========== CLUSTERING AND PERSONA FUNCTIONS ==========
 
+# Random seed used for K-Means (part of the result cache key)
+RANDOM_STATE = 42
+
+# Categorical attributes used for clustering and profiling
+CATEGORICAL_COLS = ['State', 'Industry', 'Job Title', 
+                    'Education Level', 'Age_range', 'Years of Experience', 
+                    'Gender', 'Lead Source']
+
+# Job title keywords used for dynamic seniority detection
+SENIORITY_KEYWORDS = {
+    'C-Suite': ['ceo', 'chief', 'president', 'founder', 'owner', 'partner', 'cto', 'cfo', 'coo', 'cmo'],
+    'Senior Management': ['vp', 'vice president', 'director', 'head of', 'senior manager'],
+    'Management': ['manager', 'supervisor', 'lead', 'coordinator'],
+    'Professional': ['analyst', 'specialist', 'consultant', 'engineer', 'developer', 'architect'],
+    'Entry-Level': ['intern', 'junior', 'associate', 'assistant', 'trainee'],
+}
+
+
 def analyze_cluster_characteristics(cluster_data):
     """Dynamically analyze cluster characteristics to extract meaningful insights."""
     profile = {}
@@ -158,46 +269,13 @@ def analyze_cluster_characteristics(cluster_data):
     # Dynamic seniority detection based on actual job titles
     all_titles = ' '.join(cluster_data['Job Title'].astype(str).tolist()).lower()
     
-    seniority_scores = {
-        'C-Suite': 0,
-        'Senior Management': 0,
-        'Management': 0,
-        'Professional': 0,
-        'Entry-Level': 0
-    }
-    
-    # C-Suite keywords
-    c_suite_keywords = ['ceo', 'chief', 'president', 'founder', 'owner', 'partner', 'cto', 'cfo', 'coo', 'cmo']
-    for keyword in c_suite_keywords:
-        seniority_scores['C-Suite'] += all_titles.count(keyword)
-    
-    # Senior Management keywords
-    senior_mgmt_keywords = ['vp', 'vice president', 'director', 'head of', 'senior manager']
-    for keyword in senior_mgmt_keywords:
-        seniority_scores['Senior Management'] += all_titles.count(keyword)
-    
-    # Management keywords
-    mgmt_keywords = ['manager', 'supervisor', 'lead', 'coordinator']
-    for keyword in mgmt_keywords:
-        seniority_scores['Management'] += all_titles.count(keyword)
-    
-    # Professional keywords
-    prof_keywords = ['analyst', 'specialist', 'consultant', 'engineer', 'developer', 'architect']
-    for keyword in prof_keywords:
-        seniority_scores['Professional'] += all_titles.count(keyword)
-    
-    # Entry-level keywords
-    entry_keywords = ['intern', 'junior', 'associate', 'assistant', 'trainee']
-    for keyword in entry_keywords:
-        seniority_scores['Entry-Level'] += all_titles.count(keyword)
+    seniority_scores = {level: 0 for level in SENIORITY_KEYWORDS}
+    for level, keywords in SENIORITY_KEYWORDS.items():
+        for keyword in keywords:
+            seniority_scores[level] += all_titles.count(keyword)
     
     # Determine dominant seniority
-    profile['seniority'] = max(seniority_scores, key=seniority_scores.get)
-    profile['seniority_confidence'] = max(seniority_scores.values())
-    
-    # If no clear seniority, use "Mixed Professional"
-    if max(seniority_scores.values()) == 0:
-        profile['seniority'] = 'Mixed Professional'
+    profile['seniority'], profile['seniority_confidence'] = dominant_seniority(seniority_scores)
     
     # Experience analysis
     exp_dist = cluster_data['Years of Experience'].value_counts()
@@ -226,10 +304,25 @@ def analyze_cluster_characteristics(cluster_data):
     return profile
 
 
+def dominant_seniority(seniority_scores):
+    """Pick the dominant seniority level and its keyword score."""
+    seniority = max(seniority_scores, key=seniority_scores.get)
+    confidence = max(seniority_scores.values())
+    
+    # If no clear seniority, use "Mixed Professional"
+    if confidence == 0:
+        seniority = 'Mixed Professional'
+    
+    return seniority, confidence
+
+
 def calculate_conversion_metrics(cluster_data):
     """Calculate comprehensive conversion metrics for a cluster."""
-    total_records = len(cluster_data)
-    conversions = cluster_data['is_sale'].sum()
+    return conversion_metrics_from_counts(len(cluster_data), cluster_data['is_sale'].sum())
+
+
+def conversion_metrics_from_counts(total_records, conversions):
+    """Build the conversion metrics dictionary from a record count and a conversion count."""
     conversion_rate = (conversions / total_records * 100) if total_records > 0 else 0
     
     # Determine value tier based on conversion rate
@@ -284,6 +377,11 @@ def create_persona(cluster_data, cluster_id, total_records):
     # Calculate conversion metrics
     conversion_metrics = calculate_conversion_metrics(cluster_data)
     
+    return assemble_persona(profile, conversion_metrics, cluster_id, len(cluster_data), total_records)
+
+
+def assemble_persona(profile, conversion_metrics, cluster_id, cluster_size, total_records):
+    """Assemble the persona dictionary from a cluster profile and its conversion metrics."""
     # Generate persona name
     persona_name = generate_persona_name(profile, conversion_metrics)
     
@@ -292,8 +390,8 @@ def create_persona(cluster_data, cluster_id, total_records):
         # Identification
         'persona_name': persona_name,
         'cluster_id': int(cluster_id),
-        'cluster_size': int(len(cluster_data)),
-        'cluster_percentage': float(len(cluster_data) / total_records * 100),
+        'cluster_size': int(cluster_size),
+        'cluster_percentage': float(cluster_size / total_records * 100),
         
         # Conversion Metrics (PRIMARY FOCUS)
         'conversion_metrics': conversion_metrics,
@@ -302,32 +400,32 @@ def create_persona(cluster_data, cluster_id, total_records):
         'demographics': {
             'seniority': profile['seniority'],
             'seniority_confidence': int(profile['seniority_confidence']),
-            'primary_experience': profile['primary_experience'],
+            'primary_experience': str(profile['primary_experience']),
             'experience_distribution': {str(k): int(v) for k, v in profile['experience_distribution'].items()},
-            'primary_age_range': profile['primary_age_range'],
+            'primary_age_range': str(profile['primary_age_range']),
             'age_distribution': {str(k): int(v) for k, v in profile['age_distribution'].items()},
             'gender_distribution': {str(k): int(v) for k, v in profile['gender_distribution'].items()},
         },
         
         # Geographic Profile
         'geography': {
-            'primary_state': profile['primary_state'],
+            'primary_state': str(profile['primary_state']),
             'state_concentration': float(profile['state_concentration']),
             'top_states': {str(k): int(v) for k, v in profile['top_states'].items()},
         },
         
         # Professional Profile
         'professional': {
-            'primary_industry': profile['primary_industry'],
+            'primary_industry': str(profile['primary_industry']),
             'industry_concentration': float(profile['industry_concentration']),
             'top_industries': {str(k): int(v) for k, v in profile['top_industries'].items()},
             'top_job_titles': {str(k): int(v) for k, v in profile['top_titles'].items()},
-            'primary_education': profile['primary_education'],
+            'primary_education': str(profile['primary_education']),
         },
         
         # Acquisition Profile
         'acquisition': {
-            'primary_lead_source': profile['primary_lead_source'],
+            'primary_lead_source': str(profile['primary_lead_source']),
             'lead_source_distribution': {str(k): int(v) for k, v in profile['lead_source_distribution'].items()},
         },
     }
@@ -337,7 +435,21 @@ def create_persona(cluster_data, cluster_id, total_records):
 
 def perform_clustering(df, n_clusters=4):
     """Perform K-means clustering on the dataset."""
-    # Fill missing values
+    KMeans = lazy_import('sklearn.cluster').KMeans
+    df, X_scaled = prepare_features(df)
+    
+    # Perform K-Means clustering
+    kmeans = KMeans(n_clusters=n_clusters, random_state=RANDOM_STATE, n_init=10)
+    cluster_labels = kmeans.fit_predict(X_scaled)
+    
+    # Add cluster labels to dataframe
+    df['Cluster'] = cluster_labels
+    
+    return df, kmeans, X_scaled
+
+
+def fill_missing_values(df):
+    """Fill missing categorical values with 'Unknown', in place."""
     df['Industry'] = df['Industry'].fillna('Unknown')
     df['Job Title'] = df['Job Title'].fillna('Unknown')
     df['Years of Experience'] = df['Years of Experience'].fillna('Unknown')
@@ -346,11 +458,19 @@ def perform_clustering(df, n_clusters=4):
     df['State'] = df['State'].fillna('Unknown')
     df['Gender'] = df['Gender'].fillna('Unknown')
     df['Lead Source'] = df['Lead Source'].fillna('Unknown')
+    return df
+
+
+def prepare_features(df):
+    """Fill missing values, label-encode and standardize the clustering features."""
+    preprocessing = lazy_import('sklearn.preprocessing')
+    LabelEncoder, StandardScaler = preprocessing.LabelEncoder, preprocessing.StandardScaler
+    
+    # Fill missing values
+    fill_missing_values(df)
     
     # Encode categorical variables
-    encoded_cols = ['State', 'Industry', 'Job Title', 
-                    'Education Level', 'Age_range', 'Years of Experience', 
-                    'Gender', 'Lead Source']
+    encoded_cols = CATEGORICAL_COLS
     
     df_encoded = df.copy()
     le_dict = {}
@@ -368,18 +488,174 @@ def perform_clustering(df, n_clusters=4):
     scaler = StandardScaler()
     X_scaled = scaler.fit_transform(X)
     
-    # Perform K-Means clustering
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42, n_init=10)
-    cluster_labels = kmeans.fit_predict(X_scaled)
-    
-    # Add cluster labels to dataframe
-    df['Cluster'] = cluster_labels
+    return df, X_scaled
+
+
+def generate_personas(df_clustered, n_clusters=4):
+    """Generate one persona per cluster of a clustered dataframe."""
+    drivers = compute_conversion_drivers(df_clustered, n_clusters)
     
-    return df, kmeans, X_scaled
+    personas = []
+    for cluster_id in range(n_clusters):
+        cluster_data = df_clustered[df_clustered['Cluster'] == cluster_id]
+        persona = create_persona(cluster_data, cluster_id, len(df_clustered))
+        persona['conversion_drivers'] = drivers[cluster_id]
+        personas.append(persona)
+    return personas
+
+
+def sort_personas(personas):
+    """Rank personas by conversion rate, highest first."""
+    return sorted(personas, key=lambda x: x['conversion_metrics']['conversion_rate'], reverse=True)
+
+
+# ========== CONVERSION DRIVER ANALYSIS ==========
+# For every (cluster, attribute, value) cell: support, conversions, conversion rate and
+# lift over the cluster's own conversion rate. The top cells by lift become the persona's
+# conversion drivers.
+
+# Cells need at least this many records, and this share of their cluster, to be drivers
+DRIVER_MIN_SUPPORT = 30
+DRIVER_MIN_SUPPORT_SHARE = 0.02
+# ... and must convert at least this many times better than their cluster as a whole
+DRIVER_MIN_LIFT = 1.1
+DRIVER_TOP_N = 5
+
+
+def conversion_driver_cells(df_clustered, n_clusters=4):
+    """Support and conversions of every (cluster, attribute, value) cell in one crosstab pass."""
+    labels = df_clustered['Cluster'].to_numpy()
+    # Missing or non-numeric flags count as no sale, like the pandas sums of the baseline metrics
+    sales = pd.to_numeric(df_clustered['is_sale'], errors='coerce').fillna(0).to_numpy(dtype=float)
+
+    # Factorize every attribute and offset its codes so all values share one code space
+    codes, attributes, values = [], [], []
+    for col in CATEGORICAL_COLS:
+        col_codes, uniques = pd.factorize(df_clustered[col].astype(str))
+        codes.append(col_codes + len(values))
+        attributes.extend([col] * len(uniques))
+        values.extend(uniques)
+    n_values = len(values)
+
+    # One bincount over cluster * n_values + value code counts every cell at once
+    cells = (labels[:, None] * n_values + np.column_stack(codes)).ravel()
+    n_cells = n_clusters * n_values
+    support = np.bincount(cells, minlength=n_cells)
+    conversions = np.bincount(cells, weights=np.repeat(sales, len(CATEGORICAL_COLS)), minlength=n_cells)
+
+    return pd.DataFrame({
+        'cluster': np.repeat(np.arange(n_clusters), n_values),
+        'attribute': np.tile(attributes, n_clusters),
+        'value': np.tile(np.array(values, dtype=object), n_clusters),
+        'support': support,
+        'conversions': conversions.astype(int),
+    })
+
+
+def rank_conversion_drivers(cells, n_clusters=4, min_support=DRIVER_MIN_SUPPORT,
+                            min_support_share=DRIVER_MIN_SUPPORT_SHARE, min_lift=DRIVER_MIN_LIFT,
+                            top_n=DRIVER_TOP_N):
+    """Rank the driver cells by lift within each cluster, after minimum-support and lift pruning."""
+    cells = cells[cells['support'] > 0].copy()
+
+    # Each cluster's baseline, from any single attribute (every record has one value per attribute)
+    baseline = cells[cells['attribute'] == CATEGORICAL_COLS[0]].groupby('cluster')[['support', 'conversions']].sum()
+    cluster_size = cells['cluster'].map(baseline['support'])
+    cluster_rate = cells['cluster'].map(baseline['conversions'] / baseline['support'])
+
+    cells['conversion_rate'] = cells['conversions'] / cells['support'] * 100
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cells['lift'] = cells['conversions'] / cells['support'] / cluster_rate
+
+    # The 'Unknown' placeholder for missing values is not a driver
+    keep = (
+        (cells['support'] >= min_support)
+        & (cells['support'] >= min_support_share * cluster_size)
+        & (cells['lift'] >= min_lift)
+        & (cells['value'].astype(str) != 'Unknown')
+    )
+    # Ties are broken by attribute and value so every backend ranks the cells the same way
+    ranked = cells[keep].assign(value=cells['value'].astype(str)).sort_values(
+        ['cluster', 'lift', 'support', 'attribute', 'value'], ascending=[True, False, False, True, True]
+    )
+
+    drivers = {cluster_id: [] for cluster_id in range(n_clusters)}
+    for row in ranked.groupby('cluster').head(top_n).itertuples(index=False):
+        drivers[int(row.cluster)].append({
+            'attribute': row.attribute,
+            'value': str(row.value),
+            'support': int(row.support),
+            'conversions': int(row.conversions),
+            'conversion_rate': float(row.conversion_rate),
+            'lift': float(row.lift),
+        })
+    return drivers
+
+
+def compute_conversion_drivers(df_clustered, n_clusters=4):
+    """Top conversion drivers of every cluster of a clustered dataframe."""
+    return rank_conversion_drivers(conversion_driver_cells(df_clustered, n_clusters), n_clusters)
+
+
+# ========== PROGRESSIVE CLUSTERING ==========
+# Large uploads are first clustered on a stratified sample, encoded and scaled on its own,
+# so provisional personas can be shown immediately. The full data is then encoded and
+# K-Means is refined on it, starting from the sample clusters' centroids in the full-data
+# feature space.
+
+# Uploads with more records than this are clustered progressively
+PROGRESSIVE_MIN_RECORDS = 20000
+PROGRESSIVE_SAMPLE_SIZE = 5000
+PROGRESSIVE_STRATA = ['is_sale', 'Lead Source']
+
+
+def stratified_sample_indices(df, sample_size=PROGRESSIVE_SAMPLE_SIZE, strata=PROGRESSIVE_STRATA):
+    """Row positions of a proportional stratified sample, keeping at least one record per stratum."""
+    if len(df) <= sample_size:
+        return np.arange(len(df))
+
+    rng = np.random.RandomState(RANDOM_STATE)
+    order = rng.permutation(len(df))
+    shuffled = df[strata].iloc[order]
+
+    # Take the first n records of each shuffled stratum, n proportional to the stratum size
+    groups = shuffled.groupby(strata, dropna=False, sort=False)
+    rank = groups.cumcount().to_numpy()
+    stratum_size = groups[strata[0]].transform('size').to_numpy()
+    quota = np.maximum(1, np.round(stratum_size * sample_size / len(df)))
+
+    return np.sort(order[rank < quota])
+
+
+def cluster_sample(X_sample, n_clusters=4):
+    """Fit K-Means on the standardized feature matrix of the sample."""
+    KMeans = lazy_import('sklearn.cluster').KMeans
+    kmeans = KMeans(n_clusters=n_clusters, random_state=RANDOM_STATE, n_init=10)
+    kmeans.fit(X_sample)
+    return kmeans
+
+
+def sample_centers_in_full_space(X_scaled, sample_idx, sample_labels, n_clusters=4):
+    """Centroids of the sample clusters, recomputed in the full-data feature space."""
+    # Label codes and scaling of the sample differ from the full data, so the sample
+    # centroids cannot be reused as they are: average the same records' full-data features
+    X_sample = X_scaled[sample_idx]
+    return np.vstack([X_sample[sample_labels == cluster_id].mean(axis=0) for cluster_id in range(n_clusters)])
+
+
+def refine_clustering(X_scaled, initial_centers):
+    """Fit K-Means on the full feature matrix, warm-started from the sample centroids."""
+    KMeans = lazy_import('sklearn.cluster').KMeans
+    kmeans = KMeans(n_clusters=len(initial_centers), init=initial_centers, n_init=1,
+                    random_state=RANDOM_STATE)
+    kmeans.fit(X_scaled)
+    return kmeans
 
 
 def create_visualizations(df, kmeans, X_scaled, n_clusters=4):
     """Create visualization charts."""
+    plt = lazy_import('matplotlib.pyplot')
+    PCA = lazy_import('sklearn.decomposition').PCA
     
     # 1. PCA Visualization
     pca = PCA(n_components=2)
@@ -492,9 +768,1025 @@ def create_visualizations(df, kmeans, X_scaled, n_clusters=4):
     return buf1, buf2
 
 
+def compute_chart_aggregates(df, X_scaled, n_clusters=4, bins=40):
+    """Reduce the clustered data to the compact per-cluster aggregates the interactive charts need."""
+    PCA = lazy_import('sklearn.decomposition').PCA
+    cluster_ids = np.arange(n_clusters)
+    labels = df['Cluster'].to_numpy()
+    # Missing or non-numeric flags count as no sale, like the pandas sums they replace
+    sales = pd.to_numeric(df['is_sale'], errors='coerce').fillna(0).to_numpy(dtype=float)
+
+    # Per-cluster sizes, conversions, rates and shares in one bincount pass
+    sizes = np.bincount(labels, minlength=n_clusters)
+    conversions = np.bincount(labels, weights=sales, minlength=n_clusters)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates = np.where(sizes > 0, conversions / sizes * 100, 0.0)
+
+    cluster_summary = pd.DataFrame({
+        'Cluster': cluster_ids,
+        'Records': sizes,
+        'Conversions': conversions.astype(int),
+        'Conversion Rate (%)': rates,
+        'Share (%)': sizes / max(len(df), 1) * 100,
+    })
+
+    # Binned PCA density: only non-empty (cluster, bin) cells are kept
+    pca = PCA(n_components=2)
+    X_pca = pca.fit_transform(X_scaled)
+    x_edges = np.linspace(X_pca[:, 0].min(), X_pca[:, 0].max(), bins + 1)
+    y_edges = np.linspace(X_pca[:, 1].min(), X_pca[:, 1].max(), bins + 1)
+    x_centers = (x_edges[:-1] + x_edges[1:]) / 2
+    y_centers = (y_edges[:-1] + y_edges[1:]) / 2
+
+    density_frames = []
+    for cluster_id in cluster_ids:
+        mask = labels == cluster_id
+        counts, _, _ = np.histogram2d(X_pca[mask, 0], X_pca[mask, 1], bins=[x_edges, y_edges])
+        xi, yi = np.nonzero(counts)
+        density_frames.append(pd.DataFrame({
+            'PC1': x_centers[xi],
+            'PC2': y_centers[yi],
+            'Cluster': cluster_id,
+            'Records': counts[xi, yi].astype(int),
+        }))
+    pca_density = pd.concat(density_frames, ignore_index=True)
+
+    return {
+        'cluster_summary': cluster_summary,
+        'pca_density': pca_density,
+        'explained_variance': pca.explained_variance_ratio_[:2].tolist(),
+    }
+
+
+def render_interactive_charts(chart_data, n_clusters=4):
+    """Render client-side interactive charts from precomputed cluster aggregates."""
+    alt = lazy_import('altair')
+    summary = chart_data['cluster_summary']
+    cluster_color = alt.Color('Cluster:N', scale=alt.Scale(scheme='viridis', domain=list(range(n_clusters))))
+    tooltip = ['Cluster:N', alt.Tooltip('Records:Q', format=','), alt.Tooltip('Conversions:Q', format=','),
+               alt.Tooltip('Conversion Rate (%):Q', format='.1f'), alt.Tooltip('Share (%):Q', format='.1f')]
+
+    sizes_chart = alt.Chart(summary, title='Cluster Size Distribution').mark_bar().encode(
+        x=alt.X('Cluster:O', title='Cluster ID'),
+        y=alt.Y('Records:Q', title='Number of Records'),
+        color=cluster_color,
+        tooltip=tooltip,
+    )
+
+    rate_bars = alt.Chart(summary, title='Conversion Rate by Cluster').mark_bar(color='coral').encode(
+        x=alt.X('Cluster:O', title='Cluster ID'),
+        y=alt.Y('Conversion Rate (%):Q', title='Conversion Rate (%)'),
+        tooltip=tooltip,
+    )
+    rate_average = alt.Chart(summary).mark_rule(color='red', strokeDash=[6, 4], size=2).encode(
+        y='mean(Conversion Rate (%)):Q',
+    )
+
+    conversions_chart = alt.Chart(summary, title='Total Conversions by Cluster').mark_bar(color='lightgreen').encode(
+        x=alt.X('Cluster:O', title='Cluster ID'),
+        y=alt.Y('Conversions:Q', title='Number of Conversions'),
+        tooltip=tooltip,
+    )
+
+    share_chart = alt.Chart(summary, title='Cluster Distribution').mark_arc().encode(
+        theta='Share (%):Q',
+        color=cluster_color,
+        tooltip=tooltip,
+    )
+
+    st.markdown("#### Cluster Analysis Dashboard")
+    row1_left, row1_right = st.columns(2)
+    row1_left.altair_chart(sizes_chart, use_container_width=True)
+    row1_right.altair_chart(rate_bars + rate_average, use_container_width=True)
+    row2_left, row2_right = st.columns(2)
+    row2_left.altair_chart(conversions_chart, use_container_width=True)
+    row2_right.altair_chart(share_chart, use_container_width=True)
+
+    pc1_var, pc2_var = chart_data['explained_variance']
+    density_chart = alt.Chart(
+        chart_data['pca_density'],
+        title=f'K-Means Clustering Visualization ({n_clusters} Clusters) - Binned PCA Density'
+    ).mark_circle(opacity=0.6).encode(
+        x=alt.X('PC1:Q', title=f'First Principal Component ({pc1_var:.1%} variance)'),
+        y=alt.Y('PC2:Q', title=f'Second Principal Component ({pc2_var:.1%} variance)'),
+        size=alt.Size('Records:Q', title='Records'),
+        color=cluster_color,
+        tooltip=['Cluster:N', 'Records:Q'],
+    ).interactive()
+
+    st.markdown("#### K-Means Cluster Visualization")
+    st.altair_chart(density_chart, use_container_width=True)
+
+
+# ========== DUCKDB PROFILING BACKEND ==========
+# Optional backend: the uploaded file is loaded into an on-disk DuckDB database and all
+# fill-missing, distribution and conversion statistics run as SQL queries that can spill
+# to disk. Only the encoded feature matrix and the cluster labels are held in numpy.
+
+# Number of values kept per attribute in the persona profile (None keeps all values)
+PROFILE_TOP_N = {
+    'State': 3,
+    'Industry': 3,
+    'Job Title': 5,
+    'Years of Experience': 5,
+    'Lead Source': None,
+    'Gender': None,
+    'Education Level': 3,
+    'Age_range': None,
+}
+
+
+def _sql_ident(name):
+    """Quote a column name for use in a DuckDB query."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _sql_literal(value):
+    """Quote a string literal for use in a DuckDB query."""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def open_duckdb_source(path, workdir):
+    """Register a CSV/Parquet file as the `source` view of an on-disk DuckDB database."""
+    duckdb = lazy_import('duckdb')
+    con = duckdb.connect(os.path.join(workdir, 'profiling.duckdb'))
+    con.execute(f"SET temp_directory = {_sql_literal(os.path.join(workdir, 'spill'))}")
+    con.execute("SET preserve_insertion_order = true")
+
+    exclude = ''
+    if path.lower().endswith('.parquet'):
+        relation = f"read_parquet({_sql_literal(path)})"
+    else:
+        # Type inference only samples the file: read the categorical columns as text so a
+        # late non-numeric value (e.g. "> 20 Years") cannot break the scan
+        header = [row[0] for row in con.execute(
+            f"DESCRIBE SELECT * FROM read_csv({_sql_literal(path)})"
+        ).fetchall()]
+        types = ', '.join(f"{_sql_literal(col)}: 'VARCHAR'" for col in CATEGORICAL_COLS if col in header)
+        relation = f"read_csv({_sql_literal(path)}" + (f", types = {{{types}}})" if types else ")")
+
+        # pandas exports its index as a first column with an empty header, which DuckDB
+        # names column0 (or column00, ...): drop that column, not real columns of that name
+        with open(path, newline='', encoding='utf-8', errors='replace') as f:
+            raw_header = next(csv.reader(f), [])
+        if header and raw_header and raw_header[0].strip() == '':
+            exclude = f" EXCLUDE ({_sql_ident(header[0])})"
+    con.execute(f"CREATE VIEW source AS SELECT *{exclude} FROM {relation}")
+    return con
+
+
+def duckdb_columns(con, table='source'):
+    """List the column names of a DuckDB table or view."""
+    return [row[0] for row in con.execute(f"DESCRIBE {table}").fetchall()]
+
+
+def prepare_duckdb_leads(con):
+    """Materialise the `leads` table with missing categorical values filled as 'Unknown'."""
+    columns = duckdb_columns(con)
+
+    # Drop the unnamed index column of files written from a pandas frame read back from CSV
+    index_cols = [col for col in columns if col == 'Unnamed: 0']
+    exclude = f" EXCLUDE ({', '.join(_sql_ident(col) for col in index_cols)})" if index_cols else ''
+    fills = ', '.join(f"COALESCE(CAST({_sql_ident(col)} AS VARCHAR), 'Unknown') AS {_sql_ident(col)}"
+                      for col in CATEGORICAL_COLS)
+
+    con.execute(f"CREATE OR REPLACE TABLE leads AS SELECT *{exclude} REPLACE ({fills}) FROM source")
+    return con.execute("SELECT count(*) FROM leads").fetchone()[0]
+
+
+def perform_clustering_duckdb(con, n_clusters=4):
+    """Perform K-means clustering on the `leads` table, encoding categories inside DuckDB."""
+    KMeans = lazy_import('sklearn.cluster').KMeans
+    X_scaled = prepare_features_duckdb(con)
+
+    # Perform K-Means clustering
+    kmeans = KMeans(n_clusters=n_clusters, random_state=RANDOM_STATE, n_init=10)
+    cluster_labels = kmeans.fit_predict(X_scaled)
+
+    register_labels_duckdb(con, cluster_labels)
+
+    return kmeans, X_scaled, cluster_labels
+
+
+def prepare_features_duckdb(con):
+    """Label-encode and standardize the clustering features of the `leads` table."""
+    StandardScaler = lazy_import('sklearn.preprocessing').StandardScaler
+
+    # Label-encode each attribute: codes follow the sorted distinct values, like LabelEncoder
+    joins, codes = [], []
+    for i, col in enumerate(CATEGORICAL_COLS):
+        con.execute(f"""
+            CREATE OR REPLACE TABLE codes_{i} AS
+            SELECT value, row_number() OVER (ORDER BY value) - 1 AS code
+            FROM (SELECT DISTINCT {_sql_ident(col)} AS value FROM leads)
+        """)
+        joins.append(f"JOIN codes_{i} ON codes_{i}.value = leads.{_sql_ident(col)}")
+        codes.append(f"codes_{i}.code AS c{i}")
+
+    encoded = con.execute(
+        f"SELECT {', '.join(codes)} FROM leads {' '.join(joins)} ORDER BY leads.rowid"
+    ).fetchnumpy()
+    X = np.column_stack([encoded[f'c{i}'] for i in range(len(CATEGORICAL_COLS))])
+
+    # Standardize the features
+    scaler = StandardScaler()
+    return scaler.fit_transform(X)
+
+
+def register_labels_duckdb(con, cluster_labels):
+    """Register the cluster labels and the `clustered` view used by the profiling queries."""
+    labels_df = pd.DataFrame({'row_id': np.arange(len(cluster_labels)), 'Cluster': cluster_labels})
+    con.register('labels_df', labels_df)
+    con.execute("CREATE OR REPLACE TABLE labels AS SELECT * FROM labels_df")
+    con.unregister('labels_df')
+    con.execute("""
+        CREATE OR REPLACE VIEW clustered AS
+        SELECT leads.*, labels.Cluster, labels.row_id
+        FROM leads JOIN labels ON labels.row_id = leads.rowid
+    """)
+
+
+def duckdb_distributions(con, col, top_n=None):
+    """Per-cluster value counts of one attribute, most common first (ties by first occurrence)."""
+    qualify = f"QUALIFY rank <= {int(top_n)}" if top_n else ''
+    rows = con.execute(f"""
+        SELECT Cluster, {_sql_ident(col)} AS value, count(*) AS n,
+               row_number() OVER (PARTITION BY Cluster ORDER BY count(*) DESC, min(row_id)) AS rank
+        FROM clustered
+        GROUP BY Cluster, {_sql_ident(col)}
+        {qualify}
+        ORDER BY Cluster, rank
+    """).fetchall()
+
+    distributions = {}
+    for cluster_id, value, n, _ in rows:
+        distributions.setdefault(int(cluster_id), {})[value] = int(n)
+    return distributions
+
+
+def duckdb_seniority_scores(con):
+    """Per-cluster seniority keyword counts over all job titles."""
+    keyword_rows = ', '.join(f"({_sql_literal(level)}, {_sql_literal(keyword)})"
+                             for level, keywords in SENIORITY_KEYWORDS.items() for keyword in keywords)
+    rows = con.execute(f"""
+        WITH titles AS (
+            SELECT Cluster, lower("Job Title") AS title, count(*) AS n
+            FROM clustered GROUP BY ALL
+        ), keywords(level, keyword) AS (VALUES {keyword_rows})
+        SELECT Cluster, level,
+               sum(n * (length(title) - length(replace(title, keyword, ''))) // length(keyword)) AS score
+        FROM titles CROSS JOIN keywords
+        GROUP BY Cluster, level
+    """).fetchall()
+
+    scores = {}
+    for cluster_id, level, score in rows:
+        scores.setdefault(int(cluster_id), {})[level] = int(score)
+    return scores
+
+
+def duckdb_conversion_driver_cells(con):
+    """Support and conversions of every (cluster, attribute, value) cell in one UNPIVOT query."""
+    cols = ', '.join(_sql_ident(col) for col in CATEGORICAL_COLS)
+    return con.execute(f"""
+        SELECT Cluster AS cluster, attribute, value,
+               count(*) AS support, sum(CAST(is_sale AS INTEGER)) AS conversions
+        FROM (UNPIVOT (SELECT Cluster, is_sale, {cols} FROM clustered)
+              ON {cols} INTO NAME attribute VALUE value)
+        GROUP BY ALL
+    """).df()
+
+
+def create_personas_duckdb(con, n_clusters=4):
+    """Generate the personas for every cluster from DuckDB group-by queries."""
+    counts = {
+        int(cluster_id): (int(size), int(conversions or 0))
+        for cluster_id, size, conversions in con.execute("""
+            SELECT Cluster, count(*), sum(CAST(is_sale AS INTEGER)) FROM clustered GROUP BY Cluster
+        """).fetchall()
+    }
+    total_records = sum(size for size, _ in counts.values())
+    distributions = {col: duckdb_distributions(con, col, top_n) for col, top_n in PROFILE_TOP_N.items()}
+    seniority = duckdb_seniority_scores(con)
+    drivers = rank_conversion_drivers(duckdb_conversion_driver_cells(con), n_clusters)
+
+    personas = []
+    for cluster_id in range(n_clusters):
+        size, conversions = counts.get(cluster_id, (0, 0))
+        dist = {col: distributions[col].get(cluster_id, {}) for col in PROFILE_TOP_N}
+
+        def primary(col):
+            return next(iter(dist[col]), 'Unknown')
+
+        def concentration(col):
+            return (next(iter(dist[col].values())) / size * 100) if dist[col] else 0
+
+        # Keep the keyword order of SENIORITY_KEYWORDS so ties resolve like the pandas path
+        scores = {level: seniority.get(cluster_id, {}).get(level, 0) for level in SENIORITY_KEYWORDS}
+        seniority_level, seniority_confidence = dominant_seniority(scores)
+
+        profile = {
+            'primary_state': primary('State'),
+            'state_concentration': concentration('State'),
+            'top_states': dist['State'],
+            'primary_industry': primary('Industry'),
+            'industry_concentration': concentration('Industry'),
+            'top_industries': dist['Industry'],
+            'top_titles': dist['Job Title'],
+            'seniority': seniority_level,
+            'seniority_confidence': seniority_confidence,
+            'primary_experience': primary('Years of Experience'),
+            'experience_distribution': dist['Years of Experience'],
+            'primary_lead_source': primary('Lead Source'),
+            'lead_source_distribution': dist['Lead Source'],
+            'gender_distribution': dist['Gender'],
+            'primary_education': primary('Education Level'),
+            'education_distribution': dist['Education Level'],
+            'primary_age_range': primary('Age_range'),
+            'age_distribution': dist['Age_range'],
+        }
+        conversion_metrics = conversion_metrics_from_counts(size, conversions)
+        persona = assemble_persona(profile, conversion_metrics, cluster_id, size, total_records)
+        persona['conversion_drivers'] = drivers[cluster_id]
+        personas.append(persona)
+
+    return personas
+
+
+def load_duckdb_upload(uploaded_file, workdir):
+    """Spool an upload to disk and load it into the `leads` table of a DuckDB database."""
+    # Spool the upload to disk so DuckDB can scan it without a pandas copy
+    suffix = '.parquet' if uploaded_file.name.lower().endswith('.parquet') else '.csv'
+    source_path = os.path.join(workdir, 'upload' + suffix)
+    uploaded_file.seek(0)
+    with open(source_path, 'wb') as f:
+        shutil.copyfileobj(uploaded_file, f)
+
+    con = open_duckdb_source(source_path, workdir)
+    missing_cols = [col for col in CATEGORICAL_COLS + ['is_sale'] if col not in duckdb_columns(con)]
+    if missing_cols:
+        con.close()
+        raise ValueError(f"Missing required columns: {', '.join(missing_cols)}")
+
+    prepare_duckdb_leads(con)
+    return con
+
+
+def run_duckdb_analysis(uploaded_file, n_clusters=4, cached=None):
+    """Run clustering and persona generation for an uploaded file with the DuckDB backend.
+
+    When a cached result is given, its labels and personas are reused and only the feature
+    encoding is recomputed (no model is returned).
+    """
+    workdir = tempfile.mkdtemp(prefix='persona_duckdb_')
+    con = None
+    try:
+        con = load_duckdb_upload(uploaded_file, workdir)
+        if cached is not None:
+            X_scaled = prepare_features_duckdb(con)
+            kmeans, cluster_labels, personas = None, cached['labels'], cached['personas_sorted']
+            register_labels_duckdb(con, cluster_labels)
+        else:
+            kmeans, X_scaled, cluster_labels = perform_clustering_duckdb(con, n_clusters)
+            personas = create_personas_duckdb(con, n_clusters)
+
+        # Compact frame for the charts: only the conversion flag and the labels
+        is_sale = con.execute("SELECT CAST(is_sale AS INTEGER) AS is_sale FROM leads ORDER BY rowid").fetchnumpy()
+        df_clustered = pd.DataFrame({'is_sale': is_sale['is_sale'], 'Cluster': cluster_labels})
+
+        return df_clustered, kmeans, X_scaled, personas
+    finally:
+        if con is not None:
+            con.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def export_clustered_csv_duckdb(uploaded_file, cluster_labels, export_path):
+    """Write the uploaded records with their cluster labels to a CSV file, straight from DuckDB."""
+    workdir = tempfile.mkdtemp(prefix='persona_duckdb_')
+    con = None
+    try:
+        con = load_duckdb_upload(uploaded_file, workdir)
+        register_labels_duckdb(con, cluster_labels)
+        con.execute(f"""
+            COPY (SELECT * EXCLUDE (row_id) FROM clustered ORDER BY row_id)
+            TO {_sql_literal(export_path)} (HEADER, DELIMITER ',')
+        """)
+    finally:
+        if con is not None:
+            con.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+# ========== PERSISTENT RESULT CACHE ==========
+# Clustering results are stored on disk keyed by a hash of the file contents, the feature
+# columns, the cluster count, the engine and the seed, so repeat uploads of the same file
+# skip reading the records, K-Means, persona profiling and the chart aggregates across
+# sessions and server restarts. Entries are plain .npz files (labels plus a JSON document)
+# loaded without pickle, so a cache entry can never execute code.
+
+RESULT_CACHE_DIR = os.environ.get(
+    'PERSONA_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'cluster_persona_agent')
+)
+RESULT_CACHE_MAX_BYTES = int(os.environ.get('PERSONA_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+RESULT_CACHE_VERSION = 4
+
+
+def file_sha256(uploaded_file):
+    """SHA-256 of an uploaded file's contents, read in chunks."""
+    hasher = hashlib.sha256()
+    uploaded_file.seek(0)
+    for chunk in iter(lambda: uploaded_file.read(1024 * 1024), b''):
+        hasher.update(chunk)
+    uploaded_file.seek(0)
+    return hasher.hexdigest()
+
+
+def result_cache_key(file_hash, n_clusters, engine, columns=None, seed=RANDOM_STATE):
+    """Content-addressed cache key for a file hash and the clustering settings."""
+    columns = CATEGORICAL_COLS + ['is_sale'] if columns is None else columns
+    hasher = hashlib.sha256()
+    hasher.update(f"v{RESULT_CACHE_VERSION}|k={n_clusters}|engine={engine}|seed={seed}|".encode())
+    hasher.update(json.dumps(sorted(str(col) for col in columns)).encode())
+    hasher.update(file_hash.encode())
+    return hasher.hexdigest()
+
+
+def _result_cache_path(key):
+    return os.path.join(RESULT_CACHE_DIR, key + '.npz')
+
+
+def load_cached_result(key):
+    """Load a cached result (labels, sorted personas and chart aggregates), or None on a miss."""
+    path = _result_cache_path(key)
+    try:
+        with np.load(path, allow_pickle=False) as entry:
+            labels = entry['labels']
+            document = json.loads(str(entry['document']))
+        chart_data = document['chart_data']
+        result = {
+            'labels': labels,
+            'personas_sorted': document['personas_sorted'],
+            'chart_data': {
+                'cluster_summary': pd.DataFrame(chart_data['cluster_summary']),
+                'pca_density': pd.DataFrame(chart_data['pca_density']),
+                'explained_variance': chart_data['explained_variance'],
+            },
+        }
+    except FileNotFoundError:
+        return None
+    except Exception:
+        # Corrupt or incompatible entry: drop it and recompute
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
+
+    # Mark the entry as recently used for LRU eviction
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return result
+
+
+def store_cached_result(key, result):
+    """Atomically write a result to the cache and evict the least recently used entries.
+
+    The cache is best effort: failures to write are ignored.
+    """
+    tmp_path = None
+    try:
+        chart_data = result['chart_data']
+        document = json.dumps({
+            'personas_sorted': result['personas_sorted'],
+            'chart_data': {
+                'cluster_summary': chart_data['cluster_summary'].to_dict('list'),
+                'pca_density': chart_data['pca_density'].to_dict('list'),
+                'explained_variance': list(chart_data['explained_variance']),
+            },
+        })
+        os.makedirs(RESULT_CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=RESULT_CACHE_DIR, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, labels=np.asarray(result['labels']), document=np.array(document))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, _result_cache_path(key))
+        tmp_path = None
+        evict_result_cache()
+    except (OSError, TypeError, ValueError):
+        pass
+    finally:
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def evict_result_cache(max_bytes=RESULT_CACHE_MAX_BYTES):
+    """Delete the least recently used cache entries until the cache fits in `max_bytes`."""
+    evict_least_recently_used(RESULT_CACHE_DIR, '.npz', max_bytes)
+
+
+def evict_least_recently_used(directory, suffix, max_bytes, keep=None):
+    """Delete the least recently used `suffix` files of a directory until it fits in `max_bytes`.
+
+    The file at `keep`, if given, is never deleted.
+    """
+    entries = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith(suffix) and entry.path != keep:
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    if keep is not None and os.path.exists(keep):
+        max_bytes -= os.path.getsize(keep)
+
+    total_bytes = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total_bytes <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total_bytes -= size
+
+
+# ========== PERSONA CATALOG ==========
+# Every run's personas are recorded in an indexed SQLite database together with the run
+# metadata, so personas can be looked up and compared across runs without re-parsing JSON.
+
+PERSONA_CATALOG_PATH = os.environ.get(
+    'PERSONA_CATALOG_PATH',
+    os.path.join(os.path.expanduser('~'), '.cluster_persona_agent', 'persona_catalog.sqlite')
+)
+
+PERSONA_CATALOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id      INTEGER PRIMARY KEY,
+    created_at  TEXT NOT NULL,
+    client      TEXT NOT NULL DEFAULT '',
+    file_name   TEXT,
+    file_hash   TEXT,
+    n_records   INTEGER,
+    n_clusters  INTEGER,
+    engine      TEXT
+);
+CREATE TABLE IF NOT EXISTS personas (
+    persona_id          INTEGER PRIMARY KEY,
+    run_id              INTEGER NOT NULL REFERENCES runs(run_id) ON DELETE CASCADE,
+    rank                INTEGER,
+    cluster_id          INTEGER,
+    persona_name        TEXT,
+    value_tier          TEXT,
+    conversion_rate     REAL,
+    conversions         INTEGER,
+    total_records       INTEGER,
+    cluster_percentage  REAL,
+    seniority           TEXT,
+    primary_state       TEXT,
+    primary_industry    TEXT,
+    primary_lead_source TEXT,
+    primary_experience  TEXT,
+    primary_age_range   TEXT,
+    primary_education   TEXT,
+    persona_json        TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_client_created ON runs(client, created_at);
+CREATE INDEX IF NOT EXISTS idx_runs_created ON runs(created_at);
+CREATE INDEX IF NOT EXISTS idx_runs_file_hash ON runs(file_hash);
+CREATE INDEX IF NOT EXISTS idx_personas_run ON personas(run_id);
+CREATE INDEX IF NOT EXISTS idx_personas_tier_run ON personas(value_tier, run_id);
+CREATE INDEX IF NOT EXISTS idx_personas_signature ON personas(primary_industry, seniority, primary_state);
+"""
+
+# Persona attributes compared when looking for the closest persona in other runs
+PERSONA_SIGNATURE_COLS = ['seniority', 'primary_industry', 'primary_state', 'primary_lead_source',
+                          'primary_experience', 'primary_age_range', 'primary_education']
+
+
+def open_persona_catalog(path=PERSONA_CATALOG_PATH):
+    """Open (and create if needed) the persona catalog database."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    con = sqlite3.connect(path, timeout=30)
+    con.execute("PRAGMA journal_mode = WAL")
+    con.execute("PRAGMA foreign_keys = ON")
+    con.executescript(PERSONA_CATALOG_SCHEMA)
+    return con
+
+
+def _catalog_persona_row(persona):
+    """Flatten a persona into the indexed columns of the `personas` table."""
+    cm = persona['conversion_metrics']
+    return {
+        'cluster_id': persona['cluster_id'],
+        'persona_name': persona['persona_name'],
+        'value_tier': cm['value_tier'],
+        'conversion_rate': cm['conversion_rate'],
+        'conversions': cm['conversions'],
+        'total_records': cm['total_records'],
+        'cluster_percentage': persona['cluster_percentage'],
+        'seniority': persona['demographics']['seniority'],
+        'primary_state': str(persona['geography']['primary_state']),
+        'primary_industry': str(persona['professional']['primary_industry']),
+        'primary_lead_source': str(persona['acquisition']['primary_lead_source']),
+        'primary_experience': str(persona['demographics']['primary_experience']),
+        'primary_age_range': str(persona['demographics']['primary_age_range']),
+        'primary_education': str(persona['professional']['primary_education']),
+    }
+
+
+def record_persona_run(con, personas_sorted, client='', file_name=None, file_hash=None,
+                       n_records=None, n_clusters=None, engine=None, created_at=None):
+    """Record one run and its ranked personas in the catalog; returns the run id."""
+    created_at = created_at or datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+    with con:
+        run_id = con.execute(
+            "INSERT INTO runs (created_at, client, file_name, file_hash, n_records, n_clusters, engine) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (created_at, client or '', file_name, file_hash, n_records,
+             n_clusters if n_clusters is not None else len(personas_sorted), engine)
+        ).lastrowid
+
+        rows = []
+        for rank, persona in enumerate(personas_sorted, start=1):
+            row = _catalog_persona_row(persona)
+            row.update(run_id=run_id, rank=rank, persona_json=json.dumps(persona))
+            rows.append(row)
+        columns = list(rows[0].keys()) if rows else []
+        if rows:
+            con.executemany(
+                f"INSERT INTO personas ({', '.join(columns)}) VALUES ({', '.join(':' + c for c in columns)})",
+                rows
+            )
+    return run_id
+
+
+def quarter_bounds(year, quarter):
+    """ISO start (inclusive) and end (exclusive) timestamps of a calendar quarter."""
+    start_month = 3 * (quarter - 1) + 1
+    end_year, end_month = (year + 1, 1) if quarter == 4 else (year, start_month + 3)
+    return f"{year:04d}-{start_month:02d}-01", f"{end_year:04d}-{end_month:02d}-01"
+
+
+def query_personas(con, client=None, value_tier=None, start=None, end=None, limit=500):
+    """Catalog personas filtered by client, value tier and run time range, newest runs first."""
+    conditions, params = [], []
+    if client is not None:
+        conditions.append("r.client = ?")
+        params.append(client)
+    if value_tier is not None:
+        conditions.append("p.value_tier = ?")
+        params.append(value_tier)
+    if start is not None:
+        conditions.append("r.created_at >= ?")
+        params.append(start)
+    if end is not None:
+        conditions.append("r.created_at < ?")
+        params.append(end)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+    return pd.read_sql_query(f"""
+        SELECT r.run_id, r.created_at, r.client, r.file_name, p.rank, p.persona_name,
+               p.value_tier, p.conversion_rate, p.conversions, p.total_records
+        FROM personas p JOIN runs r ON r.run_id = p.run_id
+        {where}
+        ORDER BY r.created_at DESC, p.rank
+        LIMIT ?
+    """, con, params=params + [int(limit)])
+
+
+def persona_trend(con, persona, client=None, min_matches=3):
+    """Conversion rate over time of the closest persona in every catalogued run.
+
+    Closeness is the number of matching primary attributes (seniority, industry, state,
+    lead source, experience, age range, education); runs whose best match shares fewer
+    than `min_matches` attributes are left out.
+    """
+    signature = _catalog_persona_row(persona)
+    score = ' + '.join(f"(p.{col} = :{col})" for col in PERSONA_SIGNATURE_COLS)
+    params = {col: signature[col] for col in PERSONA_SIGNATURE_COLS}
+    params.update(conversion_rate=signature['conversion_rate'], min_matches=int(min_matches), client=client)
+
+    return pd.read_sql_query(f"""
+        SELECT created_at, run_id, client, persona_name, value_tier, conversion_rate, match_score
+        FROM (
+            SELECT r.created_at, r.run_id, r.client, p.persona_name, p.value_tier,
+                   p.conversion_rate, {score} AS match_score,
+                   row_number() OVER (
+                       PARTITION BY r.run_id
+                       ORDER BY {score} DESC, abs(p.conversion_rate - :conversion_rate)
+                   ) AS match_rank
+            FROM personas p JOIN runs r ON r.run_id = p.run_id
+            WHERE :client IS NULL OR r.client = :client
+        )
+        WHERE match_rank = 1 AND match_score >= :min_matches
+        ORDER BY created_at
+    """, con, params=params)
+
+
 # ========== STREAMLIT APP ==========
 
+def render_persona_profiles(personas_sorted, approximate_note=None):
+    """Render the ranked persona cards, optionally flagged as approximate."""
+    st.markdown("### 🎭 Persona Profiles (Ranked by Conversion Rate)")
+    if approximate_note:
+        st.warning(f"⏳ {approximate_note}")
+
+    # Create tabs for each persona
+    tabs = st.tabs([f"Rank #{i+1}" for i in range(len(personas_sorted))])
+
+    for idx, (tab, persona) in enumerate(zip(tabs, personas_sorted)):
+        with tab:
+            # Determine card class based on value tier
+            tier = persona['conversion_metrics']['value_tier']
+            if tier in ['PREMIUM', 'HIGH']:
+                card_class = 'persona-card-high'
+            elif tier == 'MEDIUM':
+                card_class = 'persona-card-medium'
+            else:
+                card_class = 'persona-card-low'
+
+            # Persona card
+            st.markdown(f'<div class="persona-card {card_class}">', unsafe_allow_html=True)
+
+            # Title
+            st.markdown(f'<div class="persona-title">🏆 {persona["persona_name"]}</div>', 
+                      unsafe_allow_html=True)
+
+            # Basic info
+            st.markdown(f'<div class="info-text">Cluster ID: {persona["cluster_id"]} | '
+                      f'Size: {persona["cluster_size"]:,} '
+                      f'({persona["cluster_percentage"]:.1f}% of total)</div>', 
+                      unsafe_allow_html=True)
+
+            # Conversion metrics
+            cm = persona['conversion_metrics']
+            col1, col2 = st.columns(2)
+            with col1:
+                st.markdown(f'''
+                    <div class="metric-box">
+                        <div class="metric-label">🎯 Conversion Rate</div>
+                        <div class="metric-value">{cm["conversion_rate"]:.2f}%</div>
+                    </div>
+                ''', unsafe_allow_html=True)
+            with col2:
+                st.markdown(f'''
+                    <div class="metric-box">
+                        <div class="metric-label">💎 Value Tier</div>
+                        <div class="metric-value">{cm["value_tier"]}</div>
+                    </div>
+                ''', unsafe_allow_html=True)
+
+            col3, col4 = st.columns(2)
+            with col3:
+                st.markdown(f'''
+                    <div class="metric-box">
+                        <div class="metric-label">✅ Conversions</div>
+                        <div class="metric-value">{cm["conversions"]:,}</div>
+                    </div>
+                ''', unsafe_allow_html=True)
+            with col4:
+                st.markdown(f'''
+                    <div class="metric-box">
+                        <div class="metric-label">📊 Total Records</div>
+                        <div class="metric-value">{cm["total_records"]:,}</div>
+                    </div>
+                ''', unsafe_allow_html=True)
+
+            # Demographics
+            demo = persona['demographics']
+            st.markdown('<div class="section-header">👥 Demographics</div>', unsafe_allow_html=True)
+            st.markdown(f'''
+                <div class="info-text">
+                <strong>Seniority:</strong> {demo["seniority"]}<br>
+                <strong>Experience:</strong> {demo["primary_experience"]}<br>
+                <strong>Age Range:</strong> {demo["primary_age_range"]}<br>
+                </div>
+            ''', unsafe_allow_html=True)
+
+            # Top experience levels
+            if demo['experience_distribution']:
+                exp_top3 = sorted(demo['experience_distribution'].items(), key=lambda x: x[1], reverse=True)[:3]
+                exp_text = ", ".join([f"{exp}: {count}" for exp, count in exp_top3])
+                st.markdown(f'<div class="info-text"><strong>Top Experience:</strong> {exp_text}</div>', 
+                          unsafe_allow_html=True)
+
+            # Geography
+            geo = persona['geography']
+            st.markdown('<div class="section-header">🌍 Geography</div>', unsafe_allow_html=True)
+            st.markdown(f'''
+                <div class="info-text">
+                <strong>Primary State:</strong> {geo["primary_state"]}<br>
+                <strong>Concentration:</strong> {geo["state_concentration"]:.1f}%<br>
+                </div>
+            ''', unsafe_allow_html=True)
+
+            # Professional
+            prof = persona['professional']
+            st.markdown('<div class="section-header">💼 Professional</div>', unsafe_allow_html=True)
+            st.markdown(f'''
+                <div class="info-text">
+                <strong>Industry:</strong> {prof["primary_industry"]}<br>
+                <strong>Industry Focus:</strong> {prof["industry_concentration"]:.1f}%<br>
+                <strong>Education:</strong> {prof["primary_education"]}<br>
+                </div>
+            ''', unsafe_allow_html=True)
+
+            # Top job titles (exclude Unknown)
+            top_titles = [title for title in list(prof['top_job_titles'].keys())[:5] if title != 'Unknown'][:3]
+            if top_titles:
+                st.markdown(f'<div class="info-text"><strong>Common Titles:</strong> {", ".join(top_titles)}</div>', 
+                          unsafe_allow_html=True)
+
+            # Acquisition
+            acq = persona['acquisition']
+            st.markdown('<div class="section-header">📊 Acquisition</div>', unsafe_allow_html=True)
+            st.markdown(f'''
+                <div class="info-text">
+                <strong>Primary Lead Source:</strong> {acq["primary_lead_source"]}<br>
+                </div>
+            ''', unsafe_allow_html=True)
+
+            # Top lead sources
+            source_top3 = sorted(acq['lead_source_distribution'].items(), key=lambda x: x[1], reverse=True)[:3]
+            source_text = ", ".join([f"{src}: {count}" for src, count in source_top3])
+            st.markdown(f'<div class="info-text"><strong>Lead Sources:</strong> {source_text}</div>', 
+                      unsafe_allow_html=True)
+
+            # Conversion drivers
+            drivers = persona.get('conversion_drivers')
+            if drivers:
+                st.markdown('<div class="section-header">🚀 Conversion Drivers</div>', unsafe_allow_html=True)
+                driver_text = "<br>".join(
+                    f"<strong>{d['attribute']} = {d['value']}:</strong> {d['conversion_rate']:.1f}% conversion "
+                    f"({d['lift']:.1f}× lift, {d['support']} records)"
+                    for d in drivers
+                )
+                st.markdown(f'<div class="info-text">{driver_text}</div>', unsafe_allow_html=True)
+
+            st.markdown('</div>', unsafe_allow_html=True)
+
+
+# Clustered CSV exports kept on disk, least recently used first out beyond this size
+EXPORT_MAX_BYTES = int(os.environ.get('PERSONA_EXPORT_MAX_BYTES', 1024 * 1024 * 1024))
+
+
+@st.cache_resource(show_spinner=False)
+def export_dir():
+    """Process-wide scratch directory for the clustered CSV exports, removed at exit."""
+    path = tempfile.mkdtemp(prefix='persona_exports_')
+    atexit.register(shutil.rmtree, path, ignore_errors=True)
+    return path
+
+
+def read_upload(uploaded_file):
+    """Read an uploaded CSV/TXT or Parquet file into a dataframe."""
+    uploaded_file.seek(0)
+    if uploaded_file.name.lower().endswith('.parquet'):
+        df = pd.read_parquet(uploaded_file)
+    else:
+        df = pd.read_csv(uploaded_file, encoding='utf-8')
+    
+    # Drop unnamed index column if it exists
+    if 'Unnamed: 0' in df.columns:
+        df = df.drop(columns='Unnamed: 0')
+    return df
+
+
+def load_clustered_features(uploaded_file, backend, cached):
+    """Reload an upload's records and feature matrix for a cached result."""
+    if backend == 'DuckDB':
+        df_clustered, _, X_scaled, _ = run_duckdb_analysis(uploaded_file, cached=cached)
+    else:
+        df_clustered, X_scaled = prepare_features(read_upload(uploaded_file))
+        df_clustered['Cluster'] = cached['labels']
+    return df_clustered, X_scaled
+
+
+def render_clustered_csv_download(uploaded_file, backend, run_key, labels, df_clustered=None):
+    """Write the clustered CSV export to disk on request and offer it for download."""
+    prepare_csv = st.checkbox(
+        "📄 Prepare clustered CSV download",
+        help="Write the uploaded records with their cluster labels to a CSV file for download"
+    )
+    if not prepare_csv:
+        return
+
+    # The export is kept on disk (within EXPORT_MAX_BYTES, until the server exits) and only
+    # read into memory for the download button
+    export_path = os.path.join(export_dir(), run_key + '.csv')
+    try:
+        if os.path.exists(export_path):
+            os.utime(export_path)
+        else:
+            tmp_path = export_path + '.tmp'
+            with st.spinner('📄 Writing clustered CSV...'):
+                if backend == 'DuckDB':
+                    export_clustered_csv_duckdb(uploaded_file, labels, tmp_path)
+                else:
+                    if df_clustered is None:
+                        # Cached result: only the records and their labels are needed
+                        df_clustered = fill_missing_values(read_upload(uploaded_file))
+                        df_clustered['Cluster'] = labels
+                    df_clustered.to_csv(tmp_path, index=False)
+            os.replace(tmp_path, export_path)
+            evict_least_recently_used(export_dir(), '.csv', EXPORT_MAX_BYTES, keep=export_path)
+
+        with open(export_path, 'rb') as f:
+            st.download_button(
+                label="📥 Download Clustered Data (CSV)",
+                data=f,
+                file_name="clustered_output.csv",
+                mime="text/csv"
+            )
+    except Exception as e:
+        st.error(f"❌ Error preparing the clustered CSV: {str(e)}")
+
+
+def render_persona_trend(personas_sorted, client):
+    """Chart the conversion rate of the closest catalogued persona across runs."""
+    st.markdown("### 📈 Persona Trend Across Runs")
+    persona_names = [persona['persona_name'] for persona in personas_sorted]
+    selected = st.selectbox("Persona", persona_names, key='trend_persona')
+    persona = personas_sorted[persona_names.index(selected)]
+
+    # The catalog is best effort: an unusable database never blocks the results
+    try:
+        with closing(open_persona_catalog()) as catalog:
+            trend = persona_trend(catalog, persona, client=client)
+    except (OSError, sqlite3.Error) as e:
+        st.warning(f"⚠️ Could not read the persona catalog: {e}")
+        return
+
+    if len(trend) < 2:
+        st.info("Not enough catalogued runs with a similar persona to show a trend yet.")
+        return
+    trend['created_at'] = pd.to_datetime(trend['created_at'])
+    st.line_chart(trend, x='created_at', y='conversion_rate')
+
+
+def render_catalog_browser(client):
+    """Sidebar browser for the personas recorded in the catalog."""
+    with st.sidebar.expander("📚 Persona catalog"):
+        tier = st.selectbox("Value tier", ['All', 'PREMIUM', 'HIGH', 'MEDIUM', 'LOW', 'MINIMAL'])
+        year = st.number_input("Year", min_value=2000, max_value=2100,
+                               value=datetime.now(timezone.utc).year, step=1)
+        quarter = st.selectbox("Quarter", ['All', 'Q1', 'Q2', 'Q3', 'Q4'])
+
+        start, end = (f"{int(year):04d}-01-01", f"{int(year) + 1:04d}-01-01") if quarter == 'All' \
+            else quarter_bounds(int(year), int(quarter[1]))
+        try:
+            with closing(open_persona_catalog()) as catalog:
+                results = query_personas(catalog, client=client,
+                                         value_tier=None if tier == 'All' else tier,
+                                         start=start, end=end)
+        except (OSError, sqlite3.Error) as e:
+            st.warning(f"⚠️ Could not read the persona catalog: {e}")
+            return
+        st.dataframe(results, hide_index=True, use_container_width=True)
+
+
 def main():
+    # Sidebar settings
+    with st.sidebar:
+        st.markdown("### ⚙️ Settings")
+        chart_mode = st.radio(
+            "Chart mode",
+            ['Interactive', 'Static PNG'],
+            help="Interactive charts only send per-cluster aggregates to the browser; "
+                 "Static PNG renders full matplotlib figures on every run"
+        )
+        backend_options = ['pandas'] + (['DuckDB'] if DUCKDB_AVAILABLE else [])
+        backend = st.radio(
+            "Profiling backend",
+            backend_options,
+            help="DuckDB loads the file into an embedded on-disk database and computes the "
+                 "persona statistics with SQL, so files larger than memory can be profiled"
+        )
+        progressive = st.checkbox(
+            "Progressive results",
+            value=True,
+            help=f"For uploads over {PROGRESSIVE_MIN_RECORDS:,} records, show provisional personas "
+                 f"from a {PROGRESSIVE_SAMPLE_SIZE:,}-record stratified sample first, then refine "
+                 f"them on the full dataset"
+        )
+        client = st.text_input(
+            "Client",
+            help="Client name recorded with each run in the persona catalog"
+        ).strip()
+        record_runs = st.checkbox(
+            "Record runs in persona catalog",
+            value=True,
+            help="Store every run's personas in a local indexed database for lookup and comparison"
+        )
+        use_cache = st.checkbox(
+            "Use persistent result cache",
+            value=True,
+            help="Reuse clustering results for files that were already analyzed, "
+                 "across sessions and server restarts"
+        )
+
     # Title section
     st.markdown('<div class="title-text">🎯 Cluster and Persona Agent</div>', unsafe_allow_html=True)
     st.markdown('<div class="subtitle-text">AI-Powered Customer Segmentation & Persona Generation</div>', unsafe_allow_html=True)
@@ -502,217 +1794,198 @@ def main():
     # Create two columns
     col_left, col_right = st.columns([1, 1])
     
+    # Persona cards are drawn into a placeholder so provisional results can be replaced in place
+    persona_placeholder = col_right.empty()
+    
     with col_left:
         # Upload section
         st.markdown('<div class="upload-section">', unsafe_allow_html=True)
         st.markdown("### 📁 Please upload your file here:")
         
         uploaded_file = st.file_uploader(
-            "Choose a CSV or TXT file",
-            type=['csv', 'txt'],
-            help="Upload your customer data file (CSV or TXT format)"
+            "Choose a CSV, TXT or Parquet file",
+            type=['csv', 'txt', 'parquet'],
+            help="Upload your customer data file (CSV, TXT or Parquet format)"
         )
         st.markdown('</div>', unsafe_allow_html=True)
         
+        # The upload box is on screen: load the heavy modules in the background
+        first_paint_seconds = time.perf_counter() - _SCRIPT_START
+        if PREWARM_ENABLED:
+            start_prewarm_worker()
+        
         if uploaded_file is not None:
             try:
-                # Read the file
-                df = pd.read_csv(uploaded_file, encoding='utf-8')
-                
-                # Drop unnamed index column if it exists
-                if 'Unnamed: 0' in df.columns:
-                    df = df.drop(columns='Unnamed: 0')
+                # Look up a cached result for this exact file and settings. Progressive mode only
+                # applies to large files, so the exact pandas result is tried first
+                file_hash = file_sha256(uploaded_file)
+                cache_engines = [backend, 'pandas-progressive'] if backend == 'pandas' and progressive else [backend]
+                cache_engine, cached = backend, None
+                if use_cache:
+                    for engine in cache_engines:
+                        cached = load_cached_result(result_cache_key(file_hash, 4, engine))
+                        if cached is not None:
+                            cache_engine = engine
+                            break
                 
-                # Validate required columns
-                required_cols = ['State', 'Industry', 'Job Title', 'Education Level', 
-                               'Age_range', 'Years of Experience', 'Gender', 'Lead Source', 'is_sale']
+                # On a cache hit the records are only reloaded when the PNG charts or the CSV export need them
+                df_clustered = X_scaled = kmeans = None
                 
-                missing_cols = [col for col in required_cols if col not in df.columns]
-                
-                if missing_cols:
-                    st.error(f"❌ Missing required columns: {', '.join(missing_cols)}")
-                    return
+                if cached is not None:
+                    # Reuse the cached labels, personas and chart aggregates
+                    personas, chart_data = cached['personas_sorted'], cached['chart_data']
+                    st.success(f"✅ File uploaded successfully! ({len(cached['labels']):,} records)")
+                elif backend == 'DuckDB':
+                    # Clustering and personas are computed by DuckDB queries
+                    with st.spinner('🦆 Profiling with DuckDB and performing clustering analysis...'):
+                        df_clustered, kmeans, X_scaled, personas = run_duckdb_analysis(uploaded_file)
+                    
+                    st.success(f"✅ File uploaded successfully! ({len(df_clustered):,} records)")
+                else:
+                    # Read the file
+                    df = read_upload(uploaded_file)
+                    
+                    # Validate required columns
+                    required_cols = CATEGORICAL_COLS + ['is_sale']
+                    
+                    missing_cols = [col for col in required_cols if col not in df.columns]
+                    
+                    if missing_cols:
+                        st.error(f"❌ Missing required columns: {', '.join(missing_cols)}")
+                        render_startup_timings(first_paint_seconds)
+                        return
+                    
+                    # Show success message
+                    st.success(f"✅ File uploaded successfully! ({len(df):,} records)")
+                    
+                    if progressive and len(df) > PROGRESSIVE_MIN_RECORDS:
+                        cache_engine = 'pandas-progressive'
+                        
+                        # Provisional personas from a stratified sample, shown right away
+                        with st.spinner('⚡ Clustering a stratified sample...'):
+                            sample_idx = stratified_sample_indices(df)
+                            df_sample, X_sample = prepare_features(df.iloc[sample_idx].copy())
+                            sample_kmeans = cluster_sample(X_sample)
+                            df_sample['Cluster'] = sample_kmeans.labels_
+                            provisional = sort_personas(generate_personas(df_sample))
+                        
+                        with persona_placeholder.container():
+                            render_persona_profiles(
+                                provisional,
+                                approximate_note=f"Provisional personas from a stratified sample of "
+                                                 f"{len(df_sample):,} of {len(df):,} records. "
+                                                 f"Figures are approximate and are being refined on the full dataset..."
+                            )
+                        
+                        # Encode the full dataset and refine, warm-started from the sample clusters
+                        with st.spinner('🔄 Refining clustering on the full dataset...'):
+                            df_clustered, X_scaled = prepare_features(df)
+                            initial_centers = sample_centers_in_full_space(X_scaled, sample_idx, sample_kmeans.labels_)
+                            kmeans = refine_clustering(X_scaled, initial_centers)
+                            df_clustered['Cluster'] = kmeans.labels_
+                        
+                        with st.spinner('🎭 Generating personas...'):
+                            personas = generate_personas(df_clustered)
+                    else:
+                        # Perform clustering
+                        with st.spinner('🔄 Performing clustering analysis...'):
+                            df_clustered, kmeans, X_scaled = perform_clustering(df)
+                        
+                        # Generate personas
+                        with st.spinner('🎭 Generating personas...'):
+                            personas = generate_personas(df_clustered)
                 
-                # Show success message
-                st.success(f"✅ File uploaded successfully! ({len(df):,} records)")
+                run_key = result_cache_key(file_hash, 4, cache_engine)
+                labels = cached['labels'] if cached is not None else df_clustered['Cluster'].to_numpy()
                 
-                # Perform clustering
-                with st.spinner('🔄 Performing clustering analysis...'):
-                    df_clustered, kmeans, X_scaled = perform_clustering(df)
+                # Sort by conversion rate
+                personas_sorted = sort_personas(personas)
                 
-                # Generate personas
-                with st.spinner('🎭 Generating personas...'):
-                    personas = []
-                    for cluster_id in range(4):
-                        cluster_data = df_clustered[df_clustered['Cluster'] == cluster_id]
-                        persona = create_persona(cluster_data, cluster_id, len(df_clustered))
-                        personas.append(persona)
-                    
-                    # Sort by conversion rate
-                    personas_sorted = sorted(personas, key=lambda x: x['conversion_metrics']['conversion_rate'], reverse=True)
+                if cached is not None:
+                    st.info("⚡ Loaded cached results for this file")
+                else:
+                    # Aggregates are computed in both chart modes so a cached result serves either
+                    with st.spinner('📊 Creating visualizations...'):
+                        chart_data = compute_chart_aggregates(df_clustered, X_scaled)
+                    if use_cache:
+                        store_cached_result(run_key, {
+                            'labels': labels,
+                            'personas_sorted': personas_sorted,
+                            'chart_data': chart_data,
+                        })
                 
-                # Create visualizations
-                with st.spinner('📊 Creating visualizations...'):
-                    viz_buf, dashboard_buf = create_visualizations(df_clustered, kmeans, X_scaled)
+                # Record the run in the persona catalog, once per session
+                run_marker = (file_hash, cache_engine, client)
+                recorded_runs = st.session_state.setdefault('catalog_recorded_runs', set())
+                if record_runs and run_marker not in recorded_runs:
+                    try:
+                        with closing(open_persona_catalog()) as catalog:
+                            record_persona_run(
+                                catalog, personas_sorted, client=client,
+                                file_name=uploaded_file.name, file_hash=file_hash,
+                                n_records=len(labels), n_clusters=4, engine=cache_engine
+                            )
+                        recorded_runs.add(run_marker)
+                    except (OSError, sqlite3.Error) as e:
+                        st.warning(f"⚠️ Could not record this run in the persona catalog: {e}")
                 
                 # Display charts
                 st.markdown("### 📊 Analysis Visualizations")
-                
-                # Show cluster analysis dashboard
-                st.markdown("#### Cluster Analysis Dashboard")
-                st.image(dashboard_buf, use_container_width=True)
-                
-                # Show PCA visualization
-                st.markdown("#### K-Means Cluster Visualization")
-                st.image(viz_buf, use_container_width=True)
-                
+
+                prepare_png = chart_mode != 'Interactive'
+                if chart_mode == 'Interactive':
+                    render_interactive_charts(chart_data)
+
+                    # Static PNGs are only rendered when the user asks for the downloads
+                    prepare_png = st.checkbox(
+                        "🖼️ Prepare PNG downloads",
+                        help="Render the dashboard and PCA plot as high-resolution PNG files"
+                    )
+
+                if prepare_png:
+                    if X_scaled is None:
+                        with st.spinner('📂 Reloading the records for the PNG charts...'):
+                            df_clustered, X_scaled = load_clustered_features(uploaded_file, backend, cached)
+                    with st.spinner('🖼️ Rendering PNG files...'):
+                        viz_buf, dashboard_buf = create_visualizations(df_clustered, kmeans, X_scaled)
+
+                if chart_mode != 'Interactive':
+                    # Show cluster analysis dashboard
+                    st.markdown("#### Cluster Analysis Dashboard")
+                    st.image(dashboard_buf, use_container_width=True)
+
+                    # Show PCA visualization
+                    st.markdown("#### K-Means Cluster Visualization")
+                    st.image(viz_buf, use_container_width=True)
+
                 # Download buttons for charts
-                st.download_button(
-                    label="📥 Download Dashboard",
-                    data=dashboard_buf,
-                    file_name="cluster_analysis_dashboard.png",
-                    mime="image/png"
-                )
-                
-                st.download_button(
-                    label="📥 Download PCA Visualization",
-                    data=viz_buf,
-                    file_name="kmeans_clusters_visualization.png",
-                    mime="image/png"
-                )
-                
+                if prepare_png:
+                    st.download_button(
+                        label="📥 Download Dashboard",
+                        data=dashboard_buf,
+                        file_name="cluster_analysis_dashboard.png",
+                        mime="image/png"
+                    )
+
+                    st.download_button(
+                        label="📥 Download PCA Visualization",
+                        data=viz_buf,
+                        file_name="kmeans_clusters_visualization.png",
+                        mime="image/png"
+                    )
+
             except Exception as e:
+                persona_placeholder.empty()
                 st.error(f"❌ Error processing file: {str(e)}")
+                render_startup_timings(first_paint_seconds)
                 return
     
     # Right column - Persona summaries
     with col_right:
         if uploaded_file is not None and 'personas_sorted' in locals():
-            st.markdown("### 🎭 Persona Profiles (Ranked by Conversion Rate)")
-            
-            # Create tabs for each persona
-            tabs = st.tabs([f"Rank #{i+1}" for i in range(len(personas_sorted))])
-            
-            for idx, (tab, persona) in enumerate(zip(tabs, personas_sorted)):
-                with tab:
-                    # Determine card class based on value tier
-                    tier = persona['conversion_metrics']['value_tier']
-                    if tier in ['PREMIUM', 'HIGH']:
-                        card_class = 'persona-card-high'
-                    elif tier == 'MEDIUM':
-                        card_class = 'persona-card-medium'
-                    else:
-                        card_class = 'persona-card-low'
-                    
-                    # Persona card
-                    st.markdown(f'<div class="persona-card {card_class}">', unsafe_allow_html=True)
-                    
-                    # Title
-                    st.markdown(f'<div class="persona-title">🏆 {persona["persona_name"]}</div>', 
-                              unsafe_allow_html=True)
-                    
-                    # Basic info
-                    st.markdown(f'<div class="info-text">Cluster ID: {persona["cluster_id"]} | '
-                              f'Size: {persona["cluster_size"]:,} '
-                              f'({persona["cluster_percentage"]:.1f}% of total)</div>', 
-                              unsafe_allow_html=True)
-                    
-                    # Conversion metrics
-                    cm = persona['conversion_metrics']
-                    col1, col2 = st.columns(2)
-                    with col1:
-                        st.markdown(f'''
-                            <div class="metric-box">
-                                <div class="metric-label">🎯 Conversion Rate</div>
-                                <div class="metric-value">{cm["conversion_rate"]:.2f}%</div>
-                            </div>
-                        ''', unsafe_allow_html=True)
-                    with col2:
-                        st.markdown(f'''
-                            <div class="metric-box">
-                                <div class="metric-label">💎 Value Tier</div>
-                                <div class="metric-value">{cm["value_tier"]}</div>
-                            </div>
-                        ''', unsafe_allow_html=True)
-                    
-                    col3, col4 = st.columns(2)
-                    with col3:
-                        st.markdown(f'''
-                            <div class="metric-box">
-                                <div class="metric-label">✅ Conversions</div>
-                                <div class="metric-value">{cm["conversions"]:,}</div>
-                            </div>
-                        ''', unsafe_allow_html=True)
-                    with col4:
-                        st.markdown(f'''
-                            <div class="metric-box">
-                                <div class="metric-label">📊 Total Records</div>
-                                <div class="metric-value">{cm["total_records"]:,}</div>
-                            </div>
-                        ''', unsafe_allow_html=True)
-                    
-                    # Demographics
-                    demo = persona['demographics']
-                    st.markdown('<div class="section-header">👥 Demographics</div>', unsafe_allow_html=True)
-                    st.markdown(f'''
-                        <div class="info-text">
-                        <strong>Seniority:</strong> {demo["seniority"]}<br>
-                        <strong>Experience:</strong> {demo["primary_experience"]}<br>
-                        <strong>Age Range:</strong> {demo["primary_age_range"]}<br>
-                        </div>
-                    ''', unsafe_allow_html=True)
-                    
-                    # Top experience levels
-                    if demo['experience_distribution']:
-                        exp_top3 = sorted(demo['experience_distribution'].items(), key=lambda x: x[1], reverse=True)[:3]
-                        exp_text = ", ".join([f"{exp}: {count}" for exp, count in exp_top3])
-                        st.markdown(f'<div class="info-text"><strong>Top Experience:</strong> {exp_text}</div>', 
-                                  unsafe_allow_html=True)
-                    
-                    # Geography
-                    geo = persona['geography']
-                    st.markdown('<div class="section-header">🌍 Geography</div>', unsafe_allow_html=True)
-                    st.markdown(f'''
-                        <div class="info-text">
-                        <strong>Primary State:</strong> {geo["primary_state"]}<br>
-                        <strong>Concentration:</strong> {geo["state_concentration"]:.1f}%<br>
-                        </div>
-                    ''', unsafe_allow_html=True)
-                    
-                    # Professional
-                    prof = persona['professional']
-                    st.markdown('<div class="section-header">💼 Professional</div>', unsafe_allow_html=True)
-                    st.markdown(f'''
-                        <div class="info-text">
-                        <strong>Industry:</strong> {prof["primary_industry"]}<br>
-                        <strong>Industry Focus:</strong> {prof["industry_concentration"]:.1f}%<br>
-                        <strong>Education:</strong> {prof["primary_education"]}<br>
-                        </div>
-                    ''', unsafe_allow_html=True)
-                    
-                    # Top job titles (exclude Unknown)
-                    top_titles = [title for title in list(prof['top_job_titles'].keys())[:5] if title != 'Unknown'][:3]
-                    if top_titles:
-                        st.markdown(f'<div class="info-text"><strong>Common Titles:</strong> {", ".join(top_titles)}</div>', 
-                                  unsafe_allow_html=True)
-                    
-                    # Acquisition
-                    acq = persona['acquisition']
-                    st.markdown('<div class="section-header">📊 Acquisition</div>', unsafe_allow_html=True)
-                    st.markdown(f'''
-                        <div class="info-text">
-                        <strong>Primary Lead Source:</strong> {acq["primary_lead_source"]}<br>
-                        </div>
-                    ''', unsafe_allow_html=True)
-                    
-                    # Top lead sources
-                    source_top3 = sorted(acq['lead_source_distribution'].items(), key=lambda x: x[1], reverse=True)[:3]
-                    source_text = ", ".join([f"{src}: {count}" for src, count in source_top3])
-                    st.markdown(f'<div class="info-text"><strong>Lead Sources:</strong> {source_text}</div>', 
-                              unsafe_allow_html=True)
-                    
-                    st.markdown('</div>', unsafe_allow_html=True)
-            
+            with persona_placeholder.container():
+                render_persona_profiles(personas_sorted)
+                
             # Download personas JSON
             st.markdown("---")
             personas_json = json.dumps(personas_sorted, indent=2)
@@ -724,13 +1997,11 @@ def main():
             )
             
             # Download clustered CSV
-            csv_output = df_clustered.to_csv(index=False)
-            st.download_button(
-                label="📥 Download Clustered Data (CSV)",
-                data=csv_output,
-                file_name="clustered_output.csv",
-                mime="text/csv"
-            )
+            render_clustered_csv_download(uploaded_file, backend, run_key, labels, df_clustered)
+            
+            if record_runs:
+                st.markdown("---")
+                render_persona_trend(personas_sorted, client)
         
         else:
             # Show placeholder when no file uploaded
@@ -752,6 +2023,10 @@ def main():
                     </ul>
                 </div>
             """, unsafe_allow_html=True)
+    
+    if record_runs:
+        render_catalog_browser(client)
+    render_startup_timings(first_paint_seconds)
 
 
 if __name__ == "__main__":
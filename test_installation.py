@@ -22,9 +22,7 @@ def check_installation():
         'pandas': 'Pandas',
         'numpy': 'NumPy',
         'sklearn': 'Scikit-learn',
-        'matplotlib': 'Matplotlib',
-        'seaborn': 'Seaborn',
-        'PIL': 'Pillow'
+        'matplotlib': 'Matplotlib'
     }
     
     print("\n2. Required Packages:")
@@ -32,12 +30,8 @@ def check_installation():
     
     for package, name in packages.items():
         try:
-            if package == 'PIL':
-                import PIL
-                version = PIL.__version__
-            else:
-                module = __import__(package)
-                version = module.__version__
+            module = __import__(package)
+            version = module.__version__
             print(f"   ✓ {name}: {version}")
         except ImportError:
             print(f"   ✗ {name}: NOT INSTALLED")
@@ -45,8 +39,21 @@ def check_installation():
         except AttributeError:
             print(f"   ✓ {name}: Installed (version unknown)")
     
+    # Check optional packages
+    print("\n3. Optional Packages:")
+    try:
+        import duckdb
+        print(f"   ✓ DuckDB: {duckdb.__version__} (DuckDB profiling backend enabled)")
+    except ImportError:
+        print("   - DuckDB: not installed (DuckDB profiling backend disabled)")
+    try:
+        import seaborn
+        print(f"   ✓ Seaborn: {seaborn.__version__} (used by the analysis notebook)")
+    except ImportError:
+        print("   - Seaborn: not installed (needed for the analysis notebook only)")
+    
     # Check file existence
-    print("\n3. Application Files:")
+    print("\n4. Application Files:")
     import os
     
     files = {